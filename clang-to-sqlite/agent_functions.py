@@ -195,7 +195,11 @@ class CodebaseDB:
         cache_row = cache_cur.fetchone()
 
         if cache_row:
-            lines = cache_row["content"].splitlines()
+            content = cache_row["content"]
+            if isinstance(content, bytes):
+                # Stored as a raw blob by the extractor
+                content = content.decode("utf-8", errors="replace")
+            lines = content.splitlines()
             return "\n".join(lines[start-1:end])
 
         # Fall back to file system
@@ -9,10 +9,16 @@ Usage:
     extractor.extract_files(["src/modified.c", "src/new.c"])
 """
 
+import ctypes
 import json
 import hashlib
+import multiprocessing
+import os
 import re
+import sys
+from contextlib import contextmanager
 from dataclasses import dataclass, field
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional, Iterator
 import sqlite3
@@ -22,18 +28,248 @@ from clang.cindex import (
     TranslationUnit,
     Cursor,
     CursorKind,
+    SourceLocation,
     TypeKind,
     LinkageKind,
     StorageClass,
     TokenKind,
     Config,
+    conf,
+    register_function,
 )
 
 # Uncomment and adjust if libclang isn't found automatically
 # Config.set_library_file("/usr/lib/llvm-14/lib/libclang.so")
 
+# Raw CXCursorKind values. Hot loops compare these against the Cursor
+# struct's _kind_id field directly, skipping the CursorKind.from_id()
+# lookup behind every Cursor.kind access.
+_FUNCTION_DECL = CursorKind.FUNCTION_DECL.value
+_VAR_DECL = CursorKind.VAR_DECL.value
+_STRUCT_DECL = CursorKind.STRUCT_DECL.value
+_UNION_DECL = CursorKind.UNION_DECL.value
+_ENUM_DECL = CursorKind.ENUM_DECL.value
+_TYPEDEF_DECL = CursorKind.TYPEDEF_DECL.value
+_PARM_DECL = CursorKind.PARM_DECL.value
+_FIELD_DECL = CursorKind.FIELD_DECL.value
+_ENUM_CONSTANT_DECL = CursorKind.ENUM_CONSTANT_DECL.value
+_CALL_EXPR = CursorKind.CALL_EXPR.value
+_DECL_REF_EXPR = CursorKind.DECL_REF_EXPR.value
+_COMPOUND_STMT = CursorKind.COMPOUND_STMT.value
+_UNARY_OPERATOR = CursorKind.UNARY_OPERATOR.value
+_MACRO_DEFINITION = CursorKind.MACRO_DEFINITION.value
+_INCLUSION_DIRECTIVE = CursorKind.INCLUSION_DIRECTIVE.value
+
+# Tokens that make a binary operator an assignment to its LHS
+_ASSIGN_OPS = frozenset({
+    "=", "+=", "-=", "*=", "/=", "|=", "&=", "^=", "<<=", ">>=",
+})
+
+# Parent cursor kinds that may assign to a referenced symbol
+_BINOP_KINDS = frozenset({
+    CursorKind.BINARY_OPERATOR.value,
+    CursorKind.COMPOUND_ASSIGNMENT_OPERATOR.value,
+})
+
+# Doxygen comment scanning: strip comment markers per line, then split the
+# body on @command / \command sentinels at line start
+_DOX_STRIP = re.compile(r"^[ \t/*]+|[ \t\r]*\*+/[ \t\r]*$|[ \t\r]+$", re.MULTILINE)
+_DOX_CMD = re.compile(r"^[@\\](\w+)(?:\[([^\]]*)\])?[ \t]*", re.MULTILINE)
+_DOX_PARAM = re.compile(r"(?:\[([^\]]*)\][ \t]*)?(\S+)[ \t]*(.*)", re.DOTALL)
+_DOX_BLANK = re.compile(r"\n\n+")
+
+# Connection settings for bulk loading. Durability is relaxed to one fsync
+# per WAL checkpoint; a crash can lose the last TUs but not corrupt the DB.
+_PRAGMAS = (
+    "journal_mode=WAL",
+    "synchronous=NORMAL",
+    "temp_store=MEMORY",
+    "cache_size=-262144",  # 256 MB
+    "mmap_size=30000000000",
+)
+
+# UPDATE ... FROM needs SQLite 3.33+; older builds use a correlated subquery
+_HAS_UPDATE_FROM = sqlite3.sqlite_version_info >= (3, 33, 0)
+
+# Secondary indexes dropped for a full extraction and rebuilt once at the
+# end. idx_symbols_name and idx_symbols_file stay: refs and the bodies pass
+# look symbols up by name/file while loading.
+_DEFERRED_INDEXES = (
+    "idx_files_path",
+    "idx_symbols_kind",
+    "idx_symbols_name_kind",
+    "idx_params_function",
+    "idx_locals_function",
+    "idx_fields_type",
+    "idx_enum_constants_type",
+    "idx_enum_constants_name",
+    "idx_macros_name",
+    "idx_macros_file",
+    "idx_calls_caller",
+    "idx_calls_callee",
+    "idx_calls_callee_name",
+    "idx_refs_symbol",
+    "idx_refs_file",
+    "idx_refs_context",
+    "idx_includes_file",
+    "idx_includes_resolved",
+    "idx_docs_symbol",
+    "idx_param_docs_doc",
+)
+
+# Rows buffered per translation unit and flushed with executemany, in
+# FK-safe order. symbols and docs carry Python-assigned ids so child rows
+# can reference them before anything is written.
+_BUFFERED_INSERTS = {
+    "symbols": """INSERT INTO symbols
+        (id, name, kind, file_id, line, column, end_line, end_column,
+         is_definition, is_static, storage_class, linkage)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+    "functions": """INSERT INTO functions
+        (symbol_id, return_type, signature, is_variadic, is_inline)
+        VALUES (?, ?, ?, ?, ?)""",
+    "parameters": """INSERT INTO parameters (function_id, position, name, type)
+        VALUES (?, ?, ?, ?)""",
+    "locals": """INSERT INTO locals
+        (function_id, name, type, line, scope_depth)
+        VALUES (?, ?, ?, ?, ?)""",
+    "calls": """INSERT INTO calls
+        (caller_id, callee_name, file_id, line, column, is_indirect)
+        VALUES (?, ?, ?, ?, ?, ?)""",
+    "types": """INSERT INTO types
+        (symbol_id, kind, underlying_type, size_bytes, alignment, is_anonymous)
+        VALUES (?, ?, ?, ?, ?, ?)""",
+    "fields": """INSERT INTO fields
+        (type_id, name, type, offset_bits, size_bits,
+         is_bitfield, bitfield_width, position)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+    "enum_constants": """INSERT INTO enum_constants
+        (type_id, name, value, position)
+        VALUES (?, ?, ?, ?)""",
+    "variables": """INSERT INTO variables
+        (symbol_id, type, is_const, is_volatile)
+        VALUES (?, ?, ?, ?)""",
+    "macros": """INSERT INTO macros
+        (name, file_id, line, definition, is_function_like,
+         param_names, is_builtin)
+        VALUES (?, ?, ?, ?, ?, ?, 0)""",
+    "includes": """INSERT INTO includes
+        (file_id, included_path, resolved_path, line, is_system)
+        VALUES (?, ?, ?, ?, ?)""",
+    "refs": """INSERT INTO refs
+        (symbol_id, file_id, line, column, kind, context_function_id)
+        VALUES (?, ?, ?, ?, ?, ?)""",
+    "pending_refs": """INSERT INTO pending_refs
+        (symbol_name, file_id, line, column, kind, context_function_id)
+        VALUES (?, ?, ?, ?, ?, ?)""",
+    "docs": """INSERT INTO docs
+        (id, symbol_id, raw_comment, brief, detailed, return_doc)
+        VALUES (?, ?, ?, ?, ?, ?)""",
+    "param_docs": """INSERT INTO param_docs
+        (doc_id, param_name, description, direction)
+        VALUES (?, ?, ?, ?)""",
+}
+
+# Updates buffered alongside the inserts and applied after them. The bodies
+# pass marks indexed functions as definitions once it sees their bodies.
+_BUFFERED_UPDATES = {
+    "definitions": """UPDATE symbols
+        SET is_definition = 1, end_line = ?, end_column = ?
+        WHERE id = ?""",
+}
+
+# Copies a worker shard (attached as "shard") into the main database.
+# symbols and docs ids are shifted by :sym / :doc past the main DB's
+# current maximum; file ids are remapped by path through temp.file_map.
+_SHARD_MERGE_SQL = (
+    """INSERT INTO symbols
+       (id, name, kind, file_id, line, column, end_line, end_column,
+        is_definition, is_static, storage_class, linkage)
+       SELECT s.id + :sym, s.name, s.kind, fm.new_id, s.line, s.column,
+              s.end_line, s.end_column, s.is_definition, s.is_static,
+              s.storage_class, s.linkage
+       FROM shard.symbols s JOIN file_map fm ON fm.old_id = s.file_id""",
+    """INSERT INTO functions
+       (symbol_id, return_type, signature, is_variadic, is_inline,
+        cyclomatic_complexity)
+       SELECT symbol_id + :sym, return_type, signature, is_variadic,
+              is_inline, cyclomatic_complexity
+       FROM shard.functions""",
+    """INSERT INTO parameters (function_id, position, name, type)
+       SELECT function_id + :sym, position, name, type
+       FROM shard.parameters""",
+    """INSERT INTO locals (function_id, name, type, line, scope_depth)
+       SELECT function_id + :sym, name, type, line, scope_depth
+       FROM shard.locals""",
+    """INSERT INTO calls
+       (caller_id, callee_id, callee_name, file_id, line, column, is_indirect)
+       SELECT c.caller_id + :sym, c.callee_id + :sym, c.callee_name,
+              fm.new_id, c.line, c.column, c.is_indirect
+       FROM shard.calls c JOIN file_map fm ON fm.old_id = c.file_id""",
+    """INSERT INTO types
+       (symbol_id, kind, underlying_type, size_bytes, alignment, is_anonymous)
+       SELECT symbol_id + :sym, kind, underlying_type, size_bytes,
+              alignment, is_anonymous
+       FROM shard.types""",
+    """INSERT INTO fields
+       (type_id, name, type, offset_bits, size_bits,
+        is_bitfield, bitfield_width, position)
+       SELECT type_id + :sym, name, type, offset_bits, size_bits,
+              is_bitfield, bitfield_width, position
+       FROM shard.fields""",
+    """INSERT INTO enum_constants (type_id, name, value, position)
+       SELECT type_id + :sym, name, value, position
+       FROM shard.enum_constants""",
+    """INSERT INTO variables
+       (symbol_id, type, is_const, is_volatile, initial_value)
+       SELECT symbol_id + :sym, type, is_const, is_volatile, initial_value
+       FROM shard.variables""",
+    """INSERT INTO macros
+       (name, file_id, line, definition, is_function_like,
+        param_names, is_builtin)
+       SELECT m.name, fm.new_id, m.line, m.definition, m.is_function_like,
+              m.param_names, m.is_builtin
+       FROM shard.macros m LEFT JOIN file_map fm ON fm.old_id = m.file_id""",
+    """INSERT INTO includes
+       (file_id, included_path, resolved_path, line, is_system)
+       SELECT fm.new_id, i.included_path, i.resolved_path, i.line, i.is_system
+       FROM shard.includes i JOIN file_map fm ON fm.old_id = i.file_id""",
+    """INSERT INTO refs
+       (symbol_id, file_id, line, column, kind, context_function_id)
+       SELECT r.symbol_id + :sym, fm.new_id, r.line, r.column, r.kind,
+              r.context_function_id + :sym
+       FROM shard.refs r JOIN file_map fm ON fm.old_id = r.file_id""",
+    """INSERT INTO pending_refs
+       (symbol_name, file_id, line, column, kind, context_function_id)
+       SELECT p.symbol_name, fm.new_id, p.line, p.column, p.kind,
+              p.context_function_id + :sym
+       FROM shard.pending_refs p JOIN file_map fm ON fm.old_id = p.file_id""",
+    """INSERT INTO docs
+       (id, symbol_id, raw_comment, brief, detailed, return_doc)
+       SELECT id + :doc, symbol_id + :sym, raw_comment, brief, detailed,
+              return_doc
+       FROM shard.docs""",
+    """INSERT INTO param_docs (doc_id, param_name, description, direction)
+       SELECT doc_id + :doc, param_name, description, direction
+       FROM shard.param_docs""",
+    """INSERT OR REPLACE INTO source_cache (file_id, content)
+       SELECT fm.new_id, sc.content
+       FROM shard.source_cache sc JOIN file_map fm ON fm.old_id = sc.file_id""",
+)
+
+
+@lru_cache(maxsize=None)
+def _libclang_function(name: str, argtypes: tuple, restype):
+    """
+    Look up a libclang C function the Python bindings don't wrap.
+    Registered lazily so Config.set_library_file() still takes effect.
+    """
+    lib = conf.lib
+    register_function(lib, (name, list(argtypes), restype), False)
+    return getattr(lib, name)
+
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ExtractedFunction:
     name: str
     file: str
@@ -54,7 +290,7 @@ class ExtractedFunction:
     raw_comment: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ExtractedType:
     name: str
     kind: str  # struct, union, enum, typedef
@@ -71,7 +307,7 @@ class ExtractedType:
     raw_comment: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ExtractedVariable:
     name: str
     file: str
@@ -87,7 +323,7 @@ class ExtractedVariable:
     raw_comment: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ExtractedMacro:
     name: str
     file: str
@@ -97,7 +333,7 @@ class ExtractedMacro:
     param_names: Optional[list[str]]
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ExtractedRef:
     symbol_name: str
     symbol_kind: str
@@ -108,7 +344,7 @@ class ExtractedRef:
     context_function: Optional[str]
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ExtractedInclude:
     including_file: str
     included_path: str
@@ -121,17 +357,41 @@ class ClangExtractor:
     def __init__(self, db_path: str, workspace_root: str):
         self.db_path = db_path
         self.workspace_root = Path(workspace_root).resolve()
-        self.conn = sqlite3.connect(db_path)
+        # Autocommit mode; batches are wrapped in explicit transactions
+        self.conn = sqlite3.connect(db_path, isolation_level=None)
         self.conn.row_factory = sqlite3.Row
+        for pragma in _PRAGMAS:
+            self.conn.execute(f"PRAGMA {pragma}")
         self._init_schema()
         self.index = Index.create()
 
         # Cache for file_id lookups
         self._file_id_cache: dict[str, int] = {}
 
+        # Cache for path -> workspace-relative path (avoids resolve() syscalls)
+        self._rel_path_cache: dict[str, str] = {}
+
+        # Cache for path -> interned realpath, for cursor file matching
+        self._realpath_cache: dict[str, str] = {}
+
         # Track current function context for refs
         self._current_function: Optional[str] = None
 
+        # Set while walking a TU parsed without function bodies
+        self._skip_bodies = False
+
+        # Set in parallel workers: refs to symbols outside the shard are
+        # kept by name in pending_refs and resolved after merging
+        self._keep_unresolved_refs = False
+
+        # Per-TU insert buffers, see _begin_batch/_flush
+        self._buf: dict[str, list[tuple]] = {
+            t: [] for t in (*_BUFFERED_INSERTS, *_BUFFERED_UPDATES)
+        }
+        self._pending_symbols: dict[str, int] = {}
+        self._next_symbol_id = 1
+        self._next_doc_id = 1
+
     def _init_schema(self):
         """Create tables if they don't exist."""
         schema = '''
@@ -290,6 +550,18 @@ class ClangExtractor:
         CREATE INDEX IF NOT EXISTS idx_refs_file ON refs(file_id);
         CREATE INDEX IF NOT EXISTS idx_refs_context ON refs(context_function_id);
 
+        -- Refs whose symbol was outside a parallel worker's shard; resolved
+        -- by name into refs once all shards are merged
+        CREATE TABLE IF NOT EXISTS pending_refs (
+            id INTEGER PRIMARY KEY,
+            symbol_name TEXT NOT NULL,
+            file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+            line INTEGER NOT NULL,
+            column INTEGER,
+            kind TEXT NOT NULL,
+            context_function_id INTEGER REFERENCES functions(symbol_id) ON DELETE SET NULL
+        );
+
         -- Include graph
         CREATE TABLE IF NOT EXISTS includes (
             id INTEGER PRIMARY KEY,
@@ -323,14 +595,24 @@ class ClangExtractor:
         );
         CREATE INDEX IF NOT EXISTS idx_param_docs_doc ON param_docs(doc_id);
 
-        -- Source cache
+        -- Source cache; content is the file's raw bytes, decode to read
         CREATE TABLE IF NOT EXISTS source_cache (
             file_id INTEGER PRIMARY KEY REFERENCES files(id) ON DELETE CASCADE,
-            content TEXT NOT NULL
+            content BLOB NOT NULL
+        );
+
+        -- Parsed compile_commands.json, for incremental runs
+        CREATE TABLE IF NOT EXISTS compile_commands (
+            id INTEGER PRIMARY KEY,
+            file TEXT NOT NULL,
+            resolved_path TEXT NOT NULL,
+            directory TEXT NOT NULL,
+            entry TEXT NOT NULL
         );
+        CREATE INDEX IF NOT EXISTS idx_compile_commands_file ON compile_commands(file);
+        CREATE INDEX IF NOT EXISTS idx_compile_commands_resolved ON compile_commands(resolved_path);
         '''
         self.conn.executescript(schema)
-        self.conn.commit()
 
     # =========================================================================
     # FILE MANAGEMENT
@@ -338,11 +620,17 @@ class ClangExtractor:
 
     def _get_relative_path(self, absolute_path: str) -> str:
         """Convert absolute path to workspace-relative path."""
+        rel_path = self._rel_path_cache.get(absolute_path)
+        if rel_path is not None:
+            return rel_path
+
         try:
-            return str(Path(absolute_path).resolve().relative_to(self.workspace_root))
+            rel_path = str(Path(absolute_path).resolve().relative_to(self.workspace_root))
         except ValueError:
             # Outside workspace, use absolute
-            return absolute_path
+            rel_path = absolute_path
+        self._rel_path_cache[absolute_path] = rel_path
+        return rel_path
 
     def _get_or_create_file(self, file_path: str) -> int:
         """Get file_id, creating the file record if needed."""
@@ -397,61 +685,251 @@ class ClangExtractor:
             del self._file_id_cache[rel_path]
 
     def _cache_source(self, file_id: int, file_path: str):
-        """Cache source content for later retrieval."""
+        """
+        Cache source content for later retrieval, as raw bytes.
+        Streams the file into a preallocated blob in 64 KB chunks so the
+        whole file is never held in memory as a Python string. Before
+        Python 3.11 there is no Connection.blobopen, so the bytes are
+        inserted in one piece instead.
+        """
         try:
-            with open(file_path, "r", errors="replace") as f:
-                content = f.read()
-            self.conn.execute(
-                """INSERT OR REPLACE INTO source_cache (file_id, content)
-                   VALUES (?, ?)""",
-                (file_id, content)
-            )
+            with open(file_path, "rb") as f:
+                if not hasattr(self.conn, "blobopen"):
+                    self.conn.execute(
+                        """INSERT OR REPLACE INTO source_cache (file_id, content)
+                           VALUES (?, ?)""",
+                        (file_id, f.read())
+                    )
+                    return
+
+                size = os.fstat(f.fileno()).st_size
+                self.conn.execute(
+                    """INSERT OR REPLACE INTO source_cache (file_id, content)
+                       VALUES (?, zeroblob(?))""",
+                    (file_id, size)
+                )
+                # file_id is the rowid of source_cache
+                with self.conn.blobopen("source_cache", "content", file_id) as blob:
+                    while chunk := f.read(min(65536, size - blob.tell())):
+                        blob.write(chunk)
         except OSError:
             pass
 
+    # =========================================================================
+    # COMPILE COMMANDS INDEX
+    # =========================================================================
+
+    def _load_compile_commands_index(self, compile_commands_path: str):
+        """
+        Mirror compile_commands.json into the compile_commands table.
+        The JSON is only re-parsed when the file's mtime or size changes,
+        so small incremental runs skip parsing the whole database.
+        """
+        stat = os.stat(compile_commands_path)
+        stamp = f"{os.path.realpath(compile_commands_path)}:{stat.st_mtime_ns}:{stat.st_size}"
+
+        cur = self.conn.execute(
+            "SELECT value FROM extraction_meta WHERE key = 'compile_commands'"
+        )
+        row = cur.fetchone()
+        if row and row["value"] == stamp:
+            return
+
+        with open(compile_commands_path, "r") as f:
+            compile_commands = json.load(f)
+
+        rows = []
+        for entry in compile_commands:
+            file_path = entry["file"]
+            directory = entry.get("directory", ".")
+            resolved = os.path.realpath(os.path.join(directory, file_path))
+            rows.append((file_path, resolved, directory, json.dumps(entry)))
+
+        with self._transaction():
+            self.conn.execute("DELETE FROM compile_commands")
+            self.conn.executemany(
+                """INSERT INTO compile_commands (file, resolved_path, directory, entry)
+                   VALUES (?, ?, ?, ?)""",
+                rows
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO extraction_meta (key, value) VALUES (?, ?)",
+                ("compile_commands", stamp)
+            )
+
+    def _find_compile_command(self, file_path: str) -> Optional[dict]:
+        """
+        Look up the compile command for a file, by raw or resolved path.
+        If a file is listed more than once, the last entry wins.
+        """
+        cur = self.conn.execute(
+            """SELECT entry FROM compile_commands WHERE file = ?
+               ORDER BY id DESC LIMIT 1""",
+            (file_path,)
+        )
+        row = cur.fetchone()
+        if not row:
+            abs_path = os.path.realpath(self.workspace_root / file_path)
+            cur = self.conn.execute(
+                """SELECT entry FROM compile_commands WHERE resolved_path = ?
+                   ORDER BY id DESC LIMIT 1""",
+                (abs_path,)
+            )
+            row = cur.fetchone()
+        return json.loads(row["entry"]) if row else None
+
     # =========================================================================
     # MAIN EXTRACTION ENTRY POINTS
     # =========================================================================
 
-    def extract_all(self, compile_commands_path: str, cache_source: bool = True):
+    def extract_all(
+        self,
+        compile_commands_path: str,
+        cache_source: bool = True,
+        two_phase: bool = False
+    ):
         """
         Extract entire codebase from compile_commands.json.
         This is the full extraction, typically run overnight or on first setup.
+
+        With two_phase=True, a declarations-only sweep (function bodies
+        skipped) first populates symbols, functions and types for every
+        TU, then a second sweep re-parses with bodies for locals, calls and
+        refs. Symbol queries work after the first sweep, and refs can
+        resolve symbols defined in files extracted later.
         """
         with open(compile_commands_path, "r") as f:
             compile_commands = json.load(f)
 
         # Clear existing data
         self.conn.execute("DELETE FROM files")
-        self.conn.commit()
         self._file_id_cache.clear()
 
-        total = len(compile_commands)
-        for i, entry in enumerate(compile_commands):
+        if two_phase:
+            passes = [
+                ("Indexing", {"skip_bodies": True}),
+                ("Extracting bodies of", {"bodies_only": True}),
+            ]
+        else:
+            passes = [("Extracting", {})]
+
+        index_sql = self._drop_deferred_indexes()
+        try:
+            for label, phase in passes:
+                self._extract_entries(compile_commands, cache_source, label, **phase)
+            self._resolve_call_graph()
+        finally:
+            self._create_indexes(index_sql)
+
+        self._update_meta()
+        print("Extraction complete.")
+
+    def extract_all_parallel(
+        self,
+        compile_commands_path: str,
+        jobs: int,
+        cache_source: bool = True
+    ):
+        """
+        Full extraction with TUs spread across worker processes.
+
+        Each worker extracts a batch of compile commands into its own
+        shard database next to db_path; shards are merged into this
+        database as they finish. Calls and refs that name symbols from
+        other shards are resolved by name once everything is merged, so a
+        ref resolves whenever the symbol exists anywhere in the workspace,
+        including files that a serial run would only extract later.
+        """
+        with open(compile_commands_path, "r") as f:
+            compile_commands = json.load(f)
+
+        # Clear existing data
+        self.conn.execute("DELETE FROM files")
+        self._file_id_cache.clear()
+
+        # More batches than workers so uneven TUs balance out
+        n_batches = min(len(compile_commands), jobs * 4)
+        work = []
+        for n in range(n_batches):
+            shard_path = f"{self.db_path}.shard{n}"
+            _remove_database(shard_path)
+            work.append((shard_path, str(self.workspace_root),
+                         compile_commands[n::n_batches], cache_source))
+
+        index_sql = self._drop_deferred_indexes()
+        try:
+            with multiprocessing.Pool(jobs) as pool:
+                shards = pool.imap_unordered(_extract_shard, work)
+                for i, shard_path in enumerate(shards):
+                    print(f"Merging shard {i+1}/{n_batches}")
+                    self.merge_shard(shard_path)
+                    _remove_database(shard_path)
+            self._resolve_pending_refs()
+            self._resolve_call_graph()
+        finally:
+            self._create_indexes(index_sql)
+
+        self._update_meta()
+        print("Extraction complete.")
+
+    def merge_shard(self, shard_path: str):
+        """Copy everything extracted into a shard database into this one."""
+        self.conn.execute("ATTACH DATABASE ? AS shard", (shard_path,))
+        try:
+            with self._transaction():
+                offsets = {
+                    "sym": self.conn.execute(
+                        "SELECT COALESCE(MAX(id), 0) FROM main.symbols"
+                    ).fetchone()[0],
+                    "doc": self.conn.execute(
+                        "SELECT COALESCE(MAX(id), 0) FROM main.docs"
+                    ).fetchone()[0],
+                }
+
+                self.conn.execute(
+                    """INSERT OR IGNORE INTO main.files
+                       (path, mtime, size, hash, last_extracted)
+                       SELECT path, mtime, size, hash, last_extracted
+                       FROM shard.files"""
+                )
+                self.conn.execute("DROP TABLE IF EXISTS temp.file_map")
+                self.conn.execute(
+                    """CREATE TEMP TABLE file_map AS
+                       SELECT s.id AS old_id, m.id AS new_id
+                       FROM shard.files s JOIN main.files m ON m.path = s.path"""
+                )
+
+                for sql in _SHARD_MERGE_SQL:
+                    self.conn.execute(sql, offsets)
+
+                self.conn.execute("DROP TABLE temp.file_map")
+        finally:
+            self.conn.execute("DETACH DATABASE shard")
+
+    def _extract_entries(
+        self,
+        entries: list[dict],
+        cache_source: bool,
+        label: str = "Extracting",
+        **phase
+    ):
+        """Extract each compile command entry, reporting errors and moving on."""
+        total = len(entries)
+        for i, entry in enumerate(entries):
             file_path = entry["file"]
             directory = entry.get("directory", ".")
+            args = self._get_compile_args(entry)
 
-            # Build args from command or arguments
-            if "arguments" in entry:
-                args = entry["arguments"][1:]  # skip compiler name
-            else:
-                # Parse command string
-                import shlex
-                args = shlex.split(entry["command"])[1:]
-
-            print(f"[{i+1}/{total}] Extracting {file_path}")
+            print(f"[{i+1}/{total}] {label} {file_path}")
 
             try:
-                self._extract_file(file_path, args, directory, cache_source)
+                self._extract_file(
+                    file_path, args, directory, cache_source, **phase
+                )
             except Exception as e:
                 print(f"  ERROR: {e}")
                 continue
 
-        self.conn.commit()
-        self._resolve_call_graph()
-        self._update_meta()
-        print("Extraction complete.")
-
     def extract_files(
         self,
         file_paths: list[str],
@@ -463,32 +941,17 @@ class ClangExtractor:
         Use this for updating after workspace changes.
         """
         # Load compile commands to get args for each file
-        with open(compile_commands_path, "r") as f:
-            compile_commands = json.load(f)
-
-        # Index by file
-        commands_by_file = {}
-        for entry in compile_commands:
-            commands_by_file[entry["file"]] = entry
+        self._load_compile_commands_index(compile_commands_path)
 
         for file_path in file_paths:
             # Find matching compile command
-            entry = commands_by_file.get(file_path)
-            if not entry:
-                # Try resolving path
-                abs_path = str((self.workspace_root / file_path).resolve())
-                entry = commands_by_file.get(abs_path)
-
+            entry = self._find_compile_command(file_path)
             if not entry:
                 print(f"No compile command for {file_path}, skipping")
                 continue
 
             directory = entry.get("directory", ".")
-            if "arguments" in entry:
-                args = entry["arguments"][1:]
-            else:
-                import shlex
-                args = shlex.split(entry["command"])[1:]
+            args = self._get_compile_args(entry)
 
             # Delete old data for this file
             self._delete_file_data(file_path)
@@ -500,7 +963,6 @@ class ClangExtractor:
                 print(f"  ERROR: {e}")
                 continue
 
-        self.conn.commit()
         self._resolve_call_graph()
         self._update_meta()
 
@@ -509,11 +971,12 @@ class ClangExtractor:
         Find files that have changed since last extraction.
         Returns list of file paths that need re-extraction.
         """
-        with open(compile_commands_path, "r") as f:
-            compile_commands = json.load(f)
+        self._load_compile_commands_index(compile_commands_path)
+        cur = self.conn.execute("SELECT file, directory FROM compile_commands")
+        entries = cur.fetchall()
 
         stale = []
-        for entry in compile_commands:
+        for entry in entries:
             file_path = entry["file"]
             rel_path = self._get_relative_path(file_path)
 
@@ -525,7 +988,7 @@ class ClangExtractor:
 
             abs_path = Path(file_path)
             if not abs_path.is_absolute():
-                abs_path = Path(entry.get("directory", ".")) / file_path
+                abs_path = Path(entry["directory"]) / file_path
 
             try:
                 current_mtime = abs_path.stat().st_mtime
@@ -544,18 +1007,49 @@ class ClangExtractor:
 
         return stale
 
+    def _drop_deferred_indexes(self) -> list[str]:
+        """
+        Drop secondary indexes before a bulk load.
+        Returns their CREATE statements for _create_indexes().
+        """
+        placeholders = ", ".join("?" * len(_DEFERRED_INDEXES))
+        cur = self.conn.execute(
+            f"""SELECT sql FROM sqlite_master
+                WHERE type = 'index' AND name IN ({placeholders})""",
+            _DEFERRED_INDEXES
+        )
+        index_sql = [row["sql"] for row in cur.fetchall()]
+        for name in _DEFERRED_INDEXES:
+            self.conn.execute(f"DROP INDEX IF EXISTS {name}")
+        return index_sql
+
+    def _create_indexes(self, index_sql: list[str]):
+        """Rebuild indexes dropped for a bulk load and refresh planner stats."""
+        with self._transaction():
+            for sql in index_sql:
+                self.conn.execute(sql)
+        self.conn.execute("ANALYZE")
+
+    def _get_compile_args(self, entry: dict) -> list[str]:
+        """Build clang args from a compile command's arguments or command."""
+        if "arguments" in entry:
+            return entry["arguments"][1:]  # skip compiler name
+        # Parse command string
+        import shlex
+        return shlex.split(entry["command"])[1:]
+
     def _update_meta(self):
         """Update extraction metadata."""
         import time
-        self.conn.execute(
-            "INSERT OR REPLACE INTO extraction_meta (key, value) VALUES (?, ?)",
-            ("extracted_at", str(time.time()))
-        )
-        self.conn.execute(
-            "INSERT OR REPLACE INTO extraction_meta (key, value) VALUES (?, ?)",
-            ("workspace_root", str(self.workspace_root))
-        )
-        self.conn.commit()
+        with self._transaction():
+            self.conn.execute(
+                "INSERT OR REPLACE INTO extraction_meta (key, value) VALUES (?, ?)",
+                ("extracted_at", str(time.time()))
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO extraction_meta (key, value) VALUES (?, ?)",
+                ("workspace_root", str(self.workspace_root))
+            )
 
     # =========================================================================
     # CORE EXTRACTION LOGIC
@@ -566,22 +1060,30 @@ class ClangExtractor:
         file_path: str,
         args: list[str],
         directory: str,
-        cache_source: bool
+        cache_source: bool,
+        skip_bodies: bool = False,
+        bodies_only: bool = False
     ):
-        """Extract all information from a single translation unit."""
-        import os
+        """
+        Extract all information from a single translation unit.
+
+        skip_bodies parses declarations only and leaves function bodies for
+        a later bodies_only pass, which fills in locals, calls and refs for
+        function definitions already in the symbol table.
+        """
+        if bodies_only:
+            # Macros and includes came from the first pass
+            options = 0
+        else:
+            options = TranslationUnit.PARSE_DETAILED_PROCESSING_RECORD
+        if skip_bodies:
+            options |= TranslationUnit.PARSE_SKIP_FUNCTION_BODIES
+
         old_cwd = os.getcwd()
         os.chdir(directory)
 
         try:
-            tu = self.index.parse(
-                file_path,
-                args=args,
-                options=(
-                    TranslationUnit.PARSE_DETAILED_PROCESSING_RECORD |
-                    TranslationUnit.PARSE_SKIP_FUNCTION_BODIES * 0  # We want bodies
-                )
-            )
+            tu = self.index.parse(file_path, args=args, options=options)
         finally:
             os.chdir(old_cwd)
 
@@ -597,28 +1099,107 @@ class ClangExtractor:
         main_file = str(Path(directory) / file_path)
         file_id = self._get_or_create_file(main_file)
 
+        self._begin_batch()
+
+        if bodies_only:
+            self._extract_function_bodies(tu.cursor, main_file, file_id)
+            self._flush()
+            return
+
         if cache_source:
             self._cache_source(file_id, main_file)
 
-        # Extract macros from preprocessing
-        self._extract_macros(tu, main_file)
-
-        # Extract includes
-        self._extract_includes(tu, main_file)
+        # Extract macros and includes from preprocessing
+        self._extract_preprocessor(tu, main_file)
 
         # Walk AST
-        self._walk_cursor(tu.cursor, main_file)
+        self._skip_bodies = skip_bodies
+        try:
+            self._walk_cursor(tu.cursor, main_file)
+        finally:
+            self._skip_bodies = False
+
+        self._flush()
 
-        self.conn.commit()
+    # =========================================================================
+    # BATCHED INSERTS
+    # =========================================================================
+
+    @contextmanager
+    def _transaction(self):
+        """Run a block in one explicit transaction (the connection autocommits)."""
+        self.conn.execute("BEGIN")
+        try:
+            yield
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    def _begin_batch(self):
+        """Reset insert buffers and seed ids for a new translation unit."""
+        for rows in self._buf.values():
+            rows.clear()
+        self._pending_symbols.clear()
+        self._next_symbol_id = self.conn.execute(
+            "SELECT COALESCE(MAX(id), 0) + 1 FROM symbols"
+        ).fetchone()[0]
+        self._next_doc_id = self.conn.execute(
+            "SELECT COALESCE(MAX(id), 0) + 1 FROM docs"
+        ).fetchone()[0]
+
+    def _add_symbol(
+        self,
+        name: str,
+        kind: str,
+        file_id: int,
+        line: int,
+        column: int,
+        end_line: Optional[int] = None,
+        end_column: Optional[int] = None,
+        is_definition: bool = True,
+        is_static: bool = False,
+        storage_class: Optional[str] = None,
+        linkage: Optional[str] = None
+    ) -> int:
+        """Buffer a symbol row and return its id."""
+        symbol_id = self._next_symbol_id
+        self._next_symbol_id += 1
+        self._buf["symbols"].append(
+            (symbol_id, name, kind, file_id, line, column, end_line, end_column,
+             int(is_definition), int(is_static), storage_class, linkage)
+        )
+        self._pending_symbols.setdefault(name, symbol_id)
+        return symbol_id
+
+    def _flush(self):
+        """Write all buffered rows for the current TU in one transaction."""
+        with self._transaction():
+            for table, sql in (*_BUFFERED_INSERTS.items(),
+                               *_BUFFERED_UPDATES.items()):
+                rows = self._buf[table]
+                if rows:
+                    self.conn.executemany(sql, rows)
+                    rows.clear()
+        self._pending_symbols.clear()
 
     def _is_from_main_file(self, cursor: Cursor, main_file: str) -> bool:
         """Check if cursor is from the main file (not an include)."""
         loc = cursor.location
         if not loc.file:
             return False
-        cursor_file = str(Path(loc.file.name).resolve())
-        main_resolved = str(Path(main_file).resolve())
-        return cursor_file == main_resolved
+        return self._realpath(loc.file.name) == self._realpath(main_file)
+
+    def _realpath(self, path: str) -> str:
+        """
+        Resolve a path once per extractor. Results are interned, so equal
+        paths compare by identity.
+        """
+        resolved = self._realpath_cache.get(path)
+        if resolved is None:
+            resolved = sys.intern(os.path.realpath(path))
+            self._realpath_cache[path] = resolved
+        return resolved
 
     def _walk_cursor(self, cursor: Cursor, main_file: str, depth: int = 0):
         """Recursively walk AST and extract information."""
@@ -626,19 +1207,19 @@ class ClangExtractor:
         if cursor.location.file and not self._is_from_main_file(cursor, main_file):
             return
 
-        kind = cursor.kind
+        kind = cursor._kind_id
 
-        if kind == CursorKind.FUNCTION_DECL:
+        if kind == _FUNCTION_DECL:
             self._extract_function(cursor, main_file)
-        elif kind == CursorKind.VAR_DECL and depth == 1:  # Top-level only
+        elif kind == _VAR_DECL and depth == 1:  # Top-level only
             self._extract_global_variable(cursor, main_file)
-        elif kind == CursorKind.STRUCT_DECL:
+        elif kind == _STRUCT_DECL:
             self._extract_struct_or_union(cursor, main_file, "struct")
-        elif kind == CursorKind.UNION_DECL:
+        elif kind == _UNION_DECL:
             self._extract_struct_or_union(cursor, main_file, "union")
-        elif kind == CursorKind.ENUM_DECL:
+        elif kind == _ENUM_DECL:
             self._extract_enum(cursor, main_file)
-        elif kind == CursorKind.TYPEDEF_DECL:
+        elif kind == _TYPEDEF_DECL:
             self._extract_typedef(cursor, main_file)
 
         # Recurse into children
@@ -661,7 +1242,7 @@ class ClangExtractor:
 
         is_def = cursor.is_definition()
         is_static = cursor.storage_class == StorageClass.STATIC
-        is_inline = cursor.get_usr() and "inline" in cursor.get_usr()  # Approximation
+        is_inline = self._is_inline(cursor)
 
         # Get return type
         result_type = cursor.result_type
@@ -670,7 +1251,7 @@ class ClangExtractor:
         # Build signature
         params = []
         for child in cursor.get_children():
-            if child.kind == CursorKind.PARM_DECL:
+            if child._kind_id == _PARM_DECL:
                 param_name = child.spelling or f"param{len(params)}"
                 param_type = child.type.spelling
                 params.append((param_name, param_type))
@@ -689,42 +1270,81 @@ class ClangExtractor:
         storage = self._get_storage_class(cursor)
 
         # Insert symbol
-        cur = self.conn.execute(
-            """INSERT INTO symbols
-               (name, kind, file_id, line, column, end_line, end_column,
-                is_definition, is_static, storage_class, linkage)
-               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-            (name, "function", file_id, loc.line, loc.column,
-             extent.end.line if extent else None,
-             extent.end.column if extent else None,
-             int(is_def), int(is_static), storage, linkage)
+        symbol_id = self._add_symbol(
+            name, "function", file_id, loc.line, loc.column,
+            extent.end.line if extent else None,
+            extent.end.column if extent else None,
+            is_def, is_static, storage, linkage
         )
-        symbol_id = cur.lastrowid
 
         # Insert function details
-        self.conn.execute(
-            """INSERT INTO functions
-               (symbol_id, return_type, signature, is_variadic, is_inline)
-               VALUES (?, ?, ?, ?, ?)""",
+        self._buf["functions"].append(
             (symbol_id, return_type, signature, int(is_variadic), int(is_inline))
         )
 
         # Insert parameters
-        for pos, (param_name, param_type) in enumerate(params):
-            self.conn.execute(
-                """INSERT INTO parameters (function_id, position, name, type)
-                   VALUES (?, ?, ?, ?)""",
-                (symbol_id, pos, param_name, param_type)
-            )
+        self._buf["parameters"].extend(
+            (symbol_id, pos, param_name, param_type)
+            for pos, (param_name, param_type) in enumerate(params)
+        )
 
         # Extract documentation
         if raw_comment:
             self._extract_documentation(symbol_id, raw_comment)
 
         # If this is a definition, extract locals and calls
-        if is_def:
+        if is_def and not self._skip_bodies:
             self._extract_function_body(cursor, symbol_id, file_id, main_file)
 
+    def _extract_function_bodies(
+        self,
+        cursor: Cursor,
+        main_file: str,
+        file_id: int,
+        depth: int = 0
+    ):
+        """
+        Extract bodies for function definitions indexed by an earlier pass.
+
+        Walks the same cursors as _walk_cursor, so definitions nested in
+        extern "C" blocks or namespaces are found too. A declarations-only
+        parse reports no definitions and truncates extents at the
+        declarator, so the indexed symbol is matched by position and then
+        marked as a definition with the body's real extent.
+        """
+        if cursor.location.file and not self._is_from_main_file(cursor, main_file):
+            return
+
+        if cursor._kind_id == _FUNCTION_DECL:
+            if not cursor.is_definition():
+                return
+
+            loc = cursor.location
+            cur = self.conn.execute(
+                """SELECT id FROM symbols
+                   WHERE file_id = ? AND name = ? AND kind = 'function'
+                     AND line = ? AND column = ?
+                   LIMIT 1""",
+                (file_id, cursor.spelling, loc.line, loc.column)
+            )
+            row = cur.fetchone()
+            if not row:
+                return
+
+            extent = cursor.extent
+            self._buf["definitions"].append(
+                (extent.end.line, extent.end.column, row["id"])
+            )
+            self._extract_function_body(cursor, row["id"], file_id, main_file)
+
+            # Declarations inside the body were skipped by the first pass
+            for child in cursor.get_children():
+                self._walk_cursor(child, main_file, depth + 1)
+            return
+
+        for child in cursor.get_children():
+            self._extract_function_bodies(child, main_file, file_id, depth + 1)
+
     def _extract_function_body(
         self,
         cursor: Cursor,
@@ -740,37 +1360,32 @@ class ClangExtractor:
         locals_seen = set()
 
         def walk_body(c: Cursor, scope_depth: int = 0):
-            if c.kind == CursorKind.VAR_DECL:
+            kind = c._kind_id
+            if kind == _VAR_DECL:
                 var_name = c.spelling
                 if var_name and var_name not in locals_seen:
                     locals_seen.add(var_name)
                     var_type = c.type.spelling if c.type else "unknown"
-                    self.conn.execute(
-                        """INSERT INTO locals
-                           (function_id, name, type, line, scope_depth)
-                           VALUES (?, ?, ?, ?, ?)""",
+                    self._buf["locals"].append(
                         (function_id, var_name, var_type,
                          c.location.line, scope_depth)
                     )
 
-            elif c.kind == CursorKind.CALL_EXPR:
+            elif kind == _CALL_EXPR:
                 callee_name = c.spelling
                 if callee_name:
                     # Check if it's an indirect call (function pointer)
                     is_indirect = False
                     ref = c.referenced
-                    if ref and ref.kind != CursorKind.FUNCTION_DECL:
+                    if ref and ref._kind_id != _FUNCTION_DECL:
                         is_indirect = True
 
-                    self.conn.execute(
-                        """INSERT INTO calls
-                           (caller_id, callee_name, file_id, line, column, is_indirect)
-                           VALUES (?, ?, ?, ?, ?, ?)""",
+                    self._buf["calls"].append(
                         (function_id, callee_name, file_id,
                          c.location.line, c.location.column, int(is_indirect))
                     )
 
-            elif c.kind == CursorKind.DECL_REF_EXPR:
+            elif kind == _DECL_REF_EXPR:
                 # Cross-reference to a symbol
                 ref = c.referenced
                 if ref:
@@ -778,7 +1393,7 @@ class ClangExtractor:
 
             # Increase scope depth for compound statements
             new_depth = scope_depth
-            if c.kind == CursorKind.COMPOUND_STMT:
+            if kind == _COMPOUND_STMT:
                 new_depth += 1
 
             for child in c.get_children():
@@ -786,7 +1401,7 @@ class ClangExtractor:
 
         # Find function body (compound statement)
         for child in cursor.get_children():
-            if child.kind == CursorKind.COMPOUND_STMT:
+            if child._kind_id == _COMPOUND_STMT:
                 walk_body(child)
                 break
 
@@ -808,37 +1423,38 @@ class ClangExtractor:
         ref_kind = "read"  # Default
         parent = cursor.semantic_parent
         if parent:
-            if parent.kind == CursorKind.UNARY_OPERATOR:
+            if parent._kind_id == _UNARY_OPERATOR:
                 # Could be address-of or dereference
                 tokens = list(parent.get_tokens())
                 if tokens and tokens[0].spelling == "&":
                     ref_kind = "addr"
-            elif parent.kind in (CursorKind.BINARY_OPERATOR,
-                                  CursorKind.COMPOUND_ASSIGNMENT_OPERATOR):
+            elif parent._kind_id in _BINOP_KINDS:
                 # Check if we're on LHS of assignment
                 children = list(parent.get_children())
                 if children and children[0] == cursor:
-                    tokens = list(parent.get_tokens())
-                    if any(t.spelling in ("=", "+=", "-=", "*=", "/=",
-                                          "|=", "&=", "^=", "<<=", ">>=")
-                           for t in tokens):
+                    if any(t.spelling in _ASSIGN_OPS
+                           for t in parent.get_tokens()):
                         ref_kind = "write"
 
-        # Look up or create the symbol
+        # Look up the symbol, including ones buffered for this TU
         cur = self.conn.execute(
             "SELECT id FROM symbols WHERE name = ? LIMIT 1",
             (symbol_name,)
         )
         row = cur.fetchone()
-        if not row:
-            return  # Symbol not in our database
-
-        symbol_id = row["id"]
+        if row:
+            symbol_id = row["id"]
+        else:
+            symbol_id = self._pending_symbols.get(symbol_name)
+            if symbol_id is None:
+                if self._keep_unresolved_refs:
+                    self._buf["pending_refs"].append(
+                        (symbol_name, file_id, cursor.location.line,
+                         cursor.location.column, ref_kind, context_function_id)
+                    )
+                return  # Symbol not in our database
 
-        self.conn.execute(
-            """INSERT INTO refs
-               (symbol_id, file_id, line, column, kind, context_function_id)
-               VALUES (?, ?, ?, ?, ?, ?)""",
+        self._buf["refs"].append(
             (symbol_id, file_id, cursor.location.line,
              cursor.location.column, ref_kind, context_function_id)
         )
@@ -874,59 +1490,58 @@ class ClangExtractor:
             alignment = None
 
         # Insert symbol
-        cur = self.conn.execute(
-            """INSERT INTO symbols
-               (name, kind, file_id, line, column, is_definition, is_static)
-               VALUES (?, ?, ?, ?, ?, 1, 0)""",
-            (name, kind, file_id, loc.line, loc.column)
-        )
-        symbol_id = cur.lastrowid
+        symbol_id = self._add_symbol(name, kind, file_id, loc.line, loc.column)
 
         # Insert type details
-        self.conn.execute(
-            """INSERT INTO types
-               (symbol_id, kind, size_bytes, alignment, is_anonymous)
-               VALUES (?, ?, ?, ?, ?)""",
-            (symbol_id, kind, size, alignment, int(is_anonymous))
+        self._buf["types"].append(
+            (symbol_id, kind, None, size, alignment, int(is_anonymous))
         )
 
-        # Extract fields
+        # Extract members, numbering them in declaration order
+        handlers = self._RECORD_MEMBER_HANDLERS
         position = 0
         for child in cursor.get_children():
-            if child.kind == CursorKind.FIELD_DECL:
-                field_name = child.spelling or f"field{position}"
-                field_type = child.type.spelling if child.type else "unknown"
-
-                # Get offset
-                try:
-                    offset_bits = cursor.type.get_offset(field_name)
-                except:
-                    offset_bits = None
-
-                # Get size
-                try:
-                    size_bits = child.type.get_size() * 8 if child.type else None
-                except:
-                    size_bits = None
-
-                # Check for bitfield
-                is_bitfield = child.is_bitfield()
-                bitfield_width = child.get_bitfield_width() if is_bitfield else None
-
-                self.conn.execute(
-                    """INSERT INTO fields
-                       (type_id, name, type, offset_bits, size_bits,
-                        is_bitfield, bitfield_width, position)
-                       VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
-                    (symbol_id, field_name, field_type, offset_bits, size_bits,
-                     int(is_bitfield), bitfield_width, position)
-                )
+            handler = handlers.get(child._kind_id)
+            if handler is not None:
+                handler(self, child, cursor, symbol_id, position)
                 position += 1
 
         # Extract documentation
         if cursor.raw_comment:
             self._extract_documentation(symbol_id, cursor.raw_comment)
 
+    def _extract_field(
+        self,
+        cursor: Cursor,
+        parent: Cursor,
+        type_id: int,
+        position: int
+    ):
+        """Extract a struct/union field."""
+        field_name = cursor.spelling or f"field{position}"
+        field_type = cursor.type.spelling if cursor.type else "unknown"
+
+        # Get offset
+        try:
+            offset_bits = parent.type.get_offset(field_name)
+        except:
+            offset_bits = None
+
+        # Get size
+        try:
+            size_bits = cursor.type.get_size() * 8 if cursor.type else None
+        except:
+            size_bits = None
+
+        # Check for bitfield
+        is_bitfield = cursor.is_bitfield()
+        bitfield_width = cursor.get_bitfield_width() if is_bitfield else None
+
+        self._buf["fields"].append(
+            (type_id, field_name, field_type, offset_bits, size_bits,
+             int(is_bitfield), bitfield_width, position)
+        )
+
     def _extract_enum(self, cursor: Cursor, main_file: str):
         """Extract enum definition."""
         name = cursor.spelling
@@ -941,45 +1556,48 @@ class ClangExtractor:
         loc = cursor.location
 
         # Insert symbol
-        cur = self.conn.execute(
-            """INSERT INTO symbols
-               (name, kind, file_id, line, column, is_definition, is_static)
-               VALUES (?, ?, ?, ?, ?, 1, 0)""",
-            (name, "enum", file_id, loc.line, loc.column)
-        )
-        symbol_id = cur.lastrowid
+        symbol_id = self._add_symbol(name, "enum", file_id, loc.line, loc.column)
 
         # Insert type details
-        self.conn.execute(
-            """INSERT INTO types
-               (symbol_id, kind, is_anonymous)
-               VALUES (?, 'enum', ?)""",
-            (symbol_id, int(is_anonymous))
+        self._buf["types"].append(
+            (symbol_id, "enum", None, None, None, int(is_anonymous))
         )
 
         # Extract enum constants
+        handlers = self._ENUM_MEMBER_HANDLERS
         position = 0
         for child in cursor.get_children():
-            if child.kind == CursorKind.ENUM_CONSTANT_DECL:
-                const_name = child.spelling
-                const_value = child.enum_value
+            handler = handlers.get(child._kind_id)
+            if handler is not None:
+                handler(self, child, cursor, symbol_id, file_id, position)
+                position += 1
 
-                self.conn.execute(
-                    """INSERT INTO enum_constants
-                       (type_id, name, value, position)
-                       VALUES (?, ?, ?, ?)""",
-                    (symbol_id, const_name, const_value, position)
-                )
+    def _extract_enum_constant(
+        self,
+        cursor: Cursor,
+        parent: Cursor,
+        type_id: int,
+        file_id: int,
+        position: int
+    ):
+        """Extract an enum constant."""
+        const_name = cursor.spelling
+        const_value = cursor.enum_value
 
-                # Also add as a symbol for cross-referencing
-                self.conn.execute(
-                    """INSERT INTO symbols
-                       (name, kind, file_id, line, column, is_definition, is_static)
-                       VALUES (?, 'enum_constant', ?, ?, ?, 1, 0)""",
-                    (const_name, file_id, child.location.line, child.location.column)
-                )
+        self._buf["enum_constants"].append(
+            (type_id, const_name, const_value, position)
+        )
 
-                position += 1
+        # Also add as a symbol for cross-referencing
+        self._add_symbol(
+            const_name, "enum_constant", file_id,
+            cursor.location.line, cursor.location.column
+        )
+
+    # Member extractors by child cursor kind, built once with the class and
+    # called as handler(self, child, parent, type_id, ...)
+    _RECORD_MEMBER_HANDLERS = {_FIELD_DECL: _extract_field}
+    _ENUM_MEMBER_HANDLERS = {_ENUM_CONSTANT_DECL: _extract_enum_constant}
 
     def _extract_typedef(self, cursor: Cursor, main_file: str):
         """Extract typedef."""
@@ -1005,20 +1623,11 @@ class ClangExtractor:
         resolved_spelling = resolved.spelling if resolved else underlying_spelling
 
         # Insert symbol
-        cur = self.conn.execute(
-            """INSERT INTO symbols
-               (name, kind, file_id, line, column, is_definition, is_static)
-               VALUES (?, 'typedef', ?, ?, ?, 1, 0)""",
-            (name, file_id, loc.line, loc.column)
-        )
-        symbol_id = cur.lastrowid
+        symbol_id = self._add_symbol(name, "typedef", file_id, loc.line, loc.column)
 
         # Insert type details with resolved underlying type
-        self.conn.execute(
-            """INSERT INTO types
-               (symbol_id, kind, underlying_type, is_anonymous)
-               VALUES (?, 'typedef', ?, 0)""",
-            (symbol_id, resolved_spelling)
+        self._buf["types"].append(
+            (symbol_id, "typedef", resolved_spelling, None, None, 0)
         )
 
     # =========================================================================
@@ -1046,132 +1655,109 @@ class ClangExtractor:
         storage = self._get_storage_class(cursor)
 
         # Insert symbol
-        cur = self.conn.execute(
-            """INSERT INTO symbols
-               (name, kind, file_id, line, column, is_definition, is_static,
-                storage_class, linkage)
-               VALUES (?, 'variable', ?, ?, ?, ?, ?, ?, ?)""",
-            (name, file_id, loc.line, loc.column, int(is_def),
-             int(is_static), storage, linkage)
+        symbol_id = self._add_symbol(
+            name, "variable", file_id, loc.line, loc.column,
+            is_definition=is_def, is_static=is_static,
+            storage_class=storage, linkage=linkage
         )
-        symbol_id = cur.lastrowid
 
         # Insert variable details
-        self.conn.execute(
-            """INSERT INTO variables
-               (symbol_id, type, is_const, is_volatile)
-               VALUES (?, ?, ?, ?)""",
+        self._buf["variables"].append(
             (symbol_id, var_type, int(is_const), int(is_volatile))
         )
 
     # =========================================================================
-    # MACRO EXTRACTION
+    # PREPROCESSOR EXTRACTION
     # =========================================================================
 
-    def _extract_macros(self, tu: TranslationUnit, main_file: str):
-        """Extract macro definitions from preprocessing."""
+    def _extract_preprocessor(self, tu: TranslationUnit, main_file: str):
+        """Extract macro definitions and #include directives in one pass."""
         file_id = self._get_or_create_file(main_file)
-        main_resolved = str(Path(main_file).resolve())
-
-        # Walk through all cursors looking for macro definitions
-        for cursor in tu.cursor.walk_preorder():
-            if cursor.kind == CursorKind.MACRO_DEFINITION:
-                loc = cursor.location
-                if not loc.file:
-                    continue
-
-                cursor_file = str(Path(loc.file.name).resolve())
-                if cursor_file != main_resolved:
-                    continue
-
-                name = cursor.spelling
-                if not name:
-                    continue
-
-                # Get the definition by looking at tokens
-                tokens = list(cursor.get_tokens())
-                if not tokens:
-                    continue
-
-                # First token is the macro name
-                # For function-like macros, parameters follow
-                is_function_like = False
-                param_names = None
-                definition = ""
-
-                if len(tokens) > 1:
-                    # Check if it's function-like (has parentheses right after name)
-                    token_texts = [t.spelling for t in tokens]
-                    name_idx = 0
-
-                    if len(token_texts) > 1 and token_texts[1] == "(":
-                        is_function_like = True
-                        # Find the closing paren
-                        paren_depth = 0
-                        param_end = 1
-                        for i, t in enumerate(token_texts[1:], 1):
-                            if t == "(":
-                                paren_depth += 1
-                            elif t == ")":
-                                paren_depth -= 1
-                                if paren_depth == 0:
-                                    param_end = i
-                                    break
-
-                        # Extract parameter names
-                        param_tokens = token_texts[2:param_end]
-                        param_names = [p for p in param_tokens if p not in (",", "...")]
-
-                        # Definition is everything after the params
-                        definition = " ".join(token_texts[param_end + 1:])
-                    else:
-                        # Object-like macro
-                        definition = " ".join(token_texts[1:])
+        main_resolved = self._realpath(main_file)
+        handlers = self._PREPROCESSOR_HANDLERS
 
-                self.conn.execute(
-                    """INSERT INTO macros
-                       (name, file_id, line, definition, is_function_like,
-                        param_names, is_builtin)
-                       VALUES (?, ?, ?, ?, ?, ?, 0)""",
-                    (name, file_id, loc.line, definition, int(is_function_like),
-                     ",".join(param_names) if param_names else None)
-                )
+        # Preprocessing entities are direct children of the TU cursor
+        for cursor in tu.cursor.get_children():
+            handler = handlers.get(cursor._kind_id)
+            if handler is None:
+                continue
+
+            loc = cursor.location
+            if not loc.file:
+                continue
+            if self._realpath(loc.file.name) != main_resolved:
+                continue
+
+            handler(self, cursor, loc, file_id)
 
     # =========================================================================
-    # INCLUDE EXTRACTION
+    # MACRO EXTRACTION
     # =========================================================================
 
-    def _extract_includes(self, tu: TranslationUnit, main_file: str):
-        """Extract #include directives."""
-        file_id = self._get_or_create_file(main_file)
-        main_resolved = str(Path(main_file).resolve())
+    def _extract_macro(self, cursor: Cursor, loc: SourceLocation, file_id: int):
+        """Extract a macro definition."""
+        name = cursor.spelling
+        if not name:
+            return
+
+        # Get the definition by streaming the tokens.
+        # First token is the macro name; for function-like macros,
+        # parameters follow in parentheses.
+        tokens = cursor.get_tokens()
+        if next(tokens, None) is None:
+            return
+        first = next(tokens, None)
+
+        is_function_like = first is not None and first.spelling == "("
+        param_names = None
+        if is_function_like:
+            param_names = []
+            for token in tokens:
+                spelling = token.spelling
+                if spelling == ")":
+                    break
+                if spelling not in (",", "..."):
+                    param_names.append(spelling)
+            # Definition is everything after the params
+            definition = " ".join(t.spelling for t in tokens)
+        elif first is not None:
+            # Object-like macro
+            rest = " ".join(t.spelling for t in tokens)
+            definition = f"{first.spelling} {rest}" if rest else first.spelling
+        else:
+            definition = ""
+
+        self._buf["macros"].append(
+            (name, file_id, loc.line, definition, int(is_function_like),
+             ",".join(param_names) if param_names else None)
+        )
 
-        for cursor in tu.cursor.walk_preorder():
-            if cursor.kind == CursorKind.INCLUSION_DIRECTIVE:
-                loc = cursor.location
-                if not loc.file:
-                    continue
+    # =========================================================================
+    # INCLUDE EXTRACTION
+    # =========================================================================
 
-                cursor_file = str(Path(loc.file.name).resolve())
-                if cursor_file != main_resolved:
-                    continue
+    def _extract_include(self, cursor: Cursor, loc: SourceLocation, file_id: int):
+        """Extract an #include directive."""
+        included_file = cursor.get_included_file()
+        included_path = cursor.spelling  # As written in source
+        resolved_path = included_file.name if included_file else None
 
-                included_file = cursor.get_included_file()
-                included_path = cursor.spelling  # As written in source
-                resolved_path = included_file.name if included_file else None
+        # Determine if system include
+        # Heuristic: check if it's in a system path or uses <>
+        is_system = False
+        if resolved_path:
+            is_system = "/usr/" in resolved_path or "include" in resolved_path
 
-                # Determine if system include
-                # Heuristic: check if it's in a system path or uses <>
-                is_system = False
-                if resolved_path:
-                    is_system = "/usr/" in resolved_path or "include" in resolved_path
+        self._buf["includes"].append(
+            (file_id, included_path, resolved_path, loc.line, int(is_system))
+        )
 
-                self.conn.execute(
-                    """INSERT INTO includes
-                       (file_id, included_path, resolved_path, line, is_system)
-                       VALUES (?, ?, ?, ?, ?)""",
-                    (file_id, included_path, resolved_path, loc.line, int(is_system))
-                )
+    # Preprocessing entity extractors by cursor kind, called as
+    # handler(self, cursor, loc, file_id)
+    _PREPROCESSOR_HANDLERS = {
+        _MACRO_DEFINITION: _extract_macro,
+        _INCLUSION_DIRECTIVE: _extract_include,
+    }
 
     # =========================================================================
     # DOCUMENTATION EXTRACTION
@@ -1182,88 +1768,53 @@ class ClangExtractor:
         if not raw_comment:
             return
 
-        brief = None
-        detailed = []
         return_doc = None
         params = {}
 
-        # Simple Doxygen parsing
-        lines = raw_comment.split("\n")
-        current_section = "brief"
-        current_param = None
-
-        for line in lines:
-            # Strip comment markers
-            line = re.sub(r"^[\s*/]*", "", line)
-            line = line.strip()
-
-            if not line:
-                if current_section == "brief" and brief:
-                    current_section = "detailed"
-                continue
-
-            # Check for Doxygen commands
-            if line.startswith("@brief") or line.startswith("\\brief"):
-                brief = line.split(None, 1)[1] if len(line.split(None, 1)) > 1 else ""
-                current_section = "brief"
-            elif line.startswith("@param") or line.startswith("\\param"):
-                parts = line.split(None, 2)
-                if len(parts) >= 2:
-                    # Check for [in], [out], [in,out] direction
-                    direction = None
-                    param_name = parts[1]
-                    desc_start = 2
-
-                    if param_name.startswith("["):
-                        direction = param_name.strip("[]")
-                        if len(parts) >= 3:
-                            param_name = parts[2]
-                            desc_start = 3
-
-                    desc = " ".join(parts[desc_start:]) if len(parts) > desc_start else ""
-                    params[param_name] = {"description": desc, "direction": direction}
-                    current_param = param_name
-                current_section = "param"
-            elif line.startswith("@return") or line.startswith("\\return"):
-                return_doc = line.split(None, 1)[1] if len(line.split(None, 1)) > 1 else ""
-                current_section = "return"
-            elif line.startswith("@") or line.startswith("\\"):
-                # Other command, switch to detailed
-                current_section = "detailed"
-                detailed.append(line)
+        # Simple Doxygen parsing: text before the first command is the
+        # brief (first paragraph) and detailed description (the rest)
+        body = _DOX_STRIP.sub("", raw_comment)
+        commands = list(_DOX_CMD.finditer(body))
+        preamble_end = commands[0].start() if commands else len(body)
+        brief, detailed = _split_paragraph(body[:preamble_end])
+
+        for i, m in enumerate(commands):
+            end = commands[i + 1].start() if i + 1 < len(commands) else len(body)
+            command = m.group(1)
+            text = body[m.end():end]
+
+            if command == "brief":
+                brief, more = _split_paragraph(text)
+                brief = brief or ""
+                detailed.extend(more)
+            elif command == "param":
+                # @param [in] name desc, or @param[in] name desc
+                pm = _DOX_PARAM.match(text.strip("\n"))
+                if pm:
+                    params[pm.group(2)] = {
+                        "description": _join_lines(pm.group(3)),
+                        "direction": m.group(2) or pm.group(1),
+                    }
+            elif command in ("return", "returns"):
+                return_doc = _join_lines(text)
             else:
-                # Continuation of current section
-                if current_section == "brief":
-                    if brief:
-                        brief += " " + line
-                    else:
-                        brief = line
-                elif current_section == "detailed":
-                    detailed.append(line)
-                elif current_section == "param" and current_param:
-                    params[current_param]["description"] += " " + line
-                elif current_section == "return":
-                    return_doc += " " + line
+                # Other command, keep it verbatim in detailed
+                detailed.extend(_doc_lines(body[m.start():end]))
 
         # Insert documentation
-        cur = self.conn.execute(
-            """INSERT INTO docs
-               (symbol_id, raw_comment, brief, detailed, return_doc)
-               VALUES (?, ?, ?, ?, ?)""",
-            (symbol_id, raw_comment, brief,
+        doc_id = self._next_doc_id
+        self._next_doc_id += 1
+        self._buf["docs"].append(
+            (doc_id, symbol_id, raw_comment, brief,
              "\n".join(detailed) if detailed else None, return_doc)
         )
-        doc_id = cur.lastrowid
 
         # Insert parameter docs
-        for param_name, param_info in params.items():
-            self.conn.execute(
-                """INSERT INTO param_docs
-                   (doc_id, param_name, description, direction)
-                   VALUES (?, ?, ?, ?)""",
-                (doc_id, param_name, param_info["description"],
-                 param_info["direction"])
-            )
+        self._buf["param_docs"].extend(
+            (doc_id, param_name, param_info["description"],
+             param_info["direction"])
+            for param_name, param_info in params.items()
+        )
 
     # =========================================================================
     # POST-PROCESSING
@@ -1273,24 +1824,75 @@ class ClangExtractor:
         """
         Resolve callee_id in calls table by matching callee_name to functions.
         Run after all files are extracted.
+
+        The name -> definition map is built once (lowest symbol id wins when
+        a name is defined more than once) and joined against unresolved
+        calls, rather than running a correlated lookup per call row. SQLite
+        older than 3.33 has no UPDATE ... FROM and gets the correlated
+        lookup, with the same lowest-id rule.
         """
-        self.conn.execute("""
-            UPDATE calls
-            SET callee_id = (
-                SELECT f.symbol_id
-                FROM functions f
-                JOIN symbols s ON s.id = f.symbol_id
-                WHERE s.name = calls.callee_name AND s.is_definition = 1
-                LIMIT 1
-            )
-            WHERE callee_id IS NULL
-        """)
-        self.conn.commit()
+        with self._transaction():
+            if not _HAS_UPDATE_FROM:
+                self.conn.execute("""
+                    UPDATE calls
+                    SET callee_id = (
+                        SELECT MIN(f.symbol_id)
+                        FROM functions f
+                        JOIN symbols s ON s.id = f.symbol_id
+                        WHERE s.name = calls.callee_name AND s.is_definition = 1
+                    )
+                    WHERE callee_id IS NULL
+                """)
+                return
+
+            self.conn.execute("""
+                UPDATE calls
+                SET callee_id = defs.symbol_id
+                FROM (
+                    SELECT s.name AS name, MIN(f.symbol_id) AS symbol_id
+                    FROM functions f
+                    JOIN symbols s ON s.id = f.symbol_id
+                    WHERE s.is_definition = 1
+                    GROUP BY s.name
+                ) AS defs
+                WHERE defs.name = calls.callee_name
+                  AND calls.callee_id IS NULL
+            """)
+
+    def _resolve_pending_refs(self):
+        """
+        Resolve refs that parallel workers could not resolve in their shard.
+        Each name maps to its lowest symbol id, the symbol a serial lookup
+        would find first; names with no symbol (locals, parameters) are
+        dropped.
+        """
+        with self._transaction():
+            self.conn.execute("""
+                INSERT INTO refs
+                    (symbol_id, file_id, line, column, kind, context_function_id)
+                SELECT s.symbol_id, p.file_id, p.line, p.column, p.kind,
+                       p.context_function_id
+                FROM pending_refs p
+                JOIN (
+                    SELECT name, MIN(id) AS symbol_id
+                    FROM symbols
+                    GROUP BY name
+                ) AS s ON s.name = p.symbol_name
+                ORDER BY p.id
+            """)
+            self.conn.execute("DELETE FROM pending_refs")
 
     # =========================================================================
     # HELPERS
     # =========================================================================
 
+    def _is_inline(self, cursor: Cursor) -> bool:
+        """Check if a function is declared inline."""
+        is_inlined = _libclang_function(
+            "clang_Cursor_isFunctionInlined", (Cursor,), ctypes.c_uint
+        )
+        return bool(is_inlined(cursor))
+
     def _get_linkage(self, cursor: Cursor) -> str:
         """Get linkage kind as string."""
         linkage = cursor.linkage
@@ -1318,6 +1920,55 @@ class ClangExtractor:
         self.conn.close()
 
 
+# =============================================================================
+# DOCUMENTATION HELPERS
+# =============================================================================
+
+def _doc_lines(text: str) -> list[str]:
+    """Non-empty lines of marker-stripped comment text."""
+    return [line for line in text.split("\n") if line]
+
+
+def _join_lines(text: str) -> str:
+    """Join marker-stripped comment lines into one space-separated string."""
+    return " ".join(_doc_lines(text))
+
+
+def _split_paragraph(text: str) -> tuple[Optional[str], list[str]]:
+    """Split comment text into its first paragraph (joined) and later lines."""
+    parts = _DOX_BLANK.split(text.strip("\n"), maxsplit=1)
+    first = _join_lines(parts[0]) or None
+    rest = _doc_lines(parts[1]) if len(parts) > 1 else []
+    return first, rest
+
+
+# =============================================================================
+# PARALLEL EXTRACTION
+# =============================================================================
+
+def _extract_shard(job: tuple[str, str, list[dict], bool]) -> str:
+    """Pool worker: extract a batch of compile commands into a shard DB."""
+    shard_path, workspace_root, entries, cache_source = job
+    extractor = ClangExtractor(shard_path, workspace_root)
+    extractor._keep_unresolved_refs = True
+    try:
+        # Shards are only read back by merge_shard, which needs no indexes
+        extractor._drop_deferred_indexes()
+        extractor._extract_entries(entries, cache_source)
+    finally:
+        extractor.close()
+    return shard_path
+
+
+def _remove_database(db_path: str):
+    """Delete a SQLite database along with its WAL and shared-memory files."""
+    for suffix in ("", "-wal", "-shm"):
+        try:
+            os.remove(db_path + suffix)
+        except FileNotFoundError:
+            pass
+
+
 # =============================================================================
 # CONVENIENCE WRAPPER
 # =============================================================================
@@ -1325,17 +1976,23 @@ class ClangExtractor:
 def extract_workspace(
     workspace_root: str,
     db_path: str = "codebase.db",
-    compile_commands: str = "compile_commands.json"
+    compile_commands: str = "compile_commands.json",
+    jobs: int = 1
 ):
     """
     One-shot extraction of a workspace.
+    With jobs > 1, TUs are extracted in that many worker processes.
 
     Usage:
         extract_workspace("/path/to/workspace")
+        extract_workspace("/path/to/workspace", jobs=os.cpu_count())
     """
     extractor = ClangExtractor(db_path, workspace_root)
     cc_path = Path(workspace_root) / compile_commands
-    extractor.extract_all(str(cc_path))
+    if jobs > 1:
+        extractor.extract_all_parallel(str(cc_path), jobs)
+    else:
+        extractor.extract_all(str(cc_path))
     extractor.close()
     print(f"Database written to {db_path}")
 
@@ -1367,13 +2024,17 @@ def update_workspace(
 
 
 if __name__ == "__main__":
-    import sys
     if len(sys.argv) < 2:
-        print("Usage: python extractor.py <workspace_root> [--update]")
+        print("Usage: python extractor.py <workspace_root> [--update] [--jobs=N]")
         sys.exit(1)
 
     workspace = sys.argv[1]
+    jobs = 1
+    for arg in sys.argv[2:]:
+        if arg.startswith("--jobs="):
+            jobs = int(arg.split("=", 1)[1])
+
     if "--update" in sys.argv:
         update_workspace(workspace)
     else:
-        extract_workspace(workspace)
+        extract_workspace(workspace, jobs=jobs)
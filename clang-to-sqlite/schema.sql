@@ -155,6 +155,18 @@ CREATE INDEX idx_refs_symbol ON refs(symbol_id);
 CREATE INDEX idx_refs_file ON refs(file_id);
 CREATE INDEX idx_refs_context ON refs(context_function_id);
 
+-- Refs whose symbol was outside a parallel worker's shard; resolved by name
+-- into refs once all shards are merged, then cleared
+CREATE TABLE pending_refs (
+    id INTEGER PRIMARY KEY,
+    symbol_name TEXT NOT NULL,
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    line INTEGER NOT NULL,
+    column INTEGER,
+    kind TEXT NOT NULL,
+    context_function_id INTEGER REFERENCES functions(symbol_id) ON DELETE SET NULL
+);
+
 -- Include graph
 CREATE TABLE includes (
     id INTEGER PRIMARY KEY,
@@ -191,5 +203,16 @@ CREATE INDEX idx_param_docs_doc ON param_docs(doc_id);
 -- Source text cache (optional, for showing code without file access)
 CREATE TABLE source_cache (
     file_id INTEGER PRIMARY KEY REFERENCES files(id) ON DELETE CASCADE,
-    content TEXT NOT NULL
+    content BLOB NOT NULL  -- raw file bytes; decode (UTF-8) before use
+);
+
+-- Parsed compile_commands.json, refreshed when the file's mtime/size changes
+CREATE TABLE compile_commands (
+    id INTEGER PRIMARY KEY,
+    file TEXT NOT NULL,  -- as written in compile_commands.json
+    resolved_path TEXT NOT NULL,  -- realpath of directory/file
+    directory TEXT NOT NULL,
+    entry TEXT NOT NULL  -- the full JSON entry
 );
+CREATE INDEX idx_compile_commands_file ON compile_commands(file);
+CREATE INDEX idx_compile_commands_resolved ON compile_commands(resolved_path);
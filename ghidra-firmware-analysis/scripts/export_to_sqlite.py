@@ -29,9 +29,33 @@ OUTPUT_DB = args[0]
 # Script version for tracking
 SCRIPT_VERSION = "1.0.0"
 
+# The output is a one-shot artifact that is deleted and rebuilt on every
+# run, so durability is traded for load speed: no journal, no fsync, and
+# an exclusive lock for the lifetime of the connection.
+EXPORT_PRAGMAS = [
+    "PRAGMA journal_mode=OFF",
+    "PRAGMA synchronous=OFF",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-262144",  # 256 MiB
+    "PRAGMA locking_mode=EXCLUSIVE",
+]
 
-def create_schema(conn):
-    """Create all database tables."""
+# Rows buffered per executemany() call in the bulk exporters
+BATCH_SIZE = 5000
+
+# Disassembly rows are large, so their buffer is also capped by total text size
+DISASM_BATCH_CHARS = 8 * 1024 * 1024
+
+
+def flush_batch(cursor, sql, batch):
+    """Insert buffered rows with a single executemany() and empty the buffer."""
+    if batch:
+        cursor.executemany(sql, batch)
+        del batch[:]
+
+
+def create_tables(conn):
+    """Create all database tables (indexes are built by create_indexes)."""
     cursor = conn.cursor()
     
     # Metadata table
@@ -54,7 +78,6 @@ def create_schema(conn):
             is_initialized INTEGER
         )
     """)
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_segments_addr ON segments(start_address, end_address)")
     
     # Functions table
     cursor.execute("""
@@ -72,8 +95,6 @@ def create_schema(conn):
             comment TEXT
         )
     """)
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_functions_name ON functions(name)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_functions_addr ON functions(entry_address)")
     
     # Symbols table
     cursor.execute("""
@@ -87,9 +108,6 @@ def create_schema(conn):
             is_primary INTEGER
         )
     """)
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_symbols_name ON symbols(name)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_symbols_addr ON symbols(address)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_symbols_type ON symbols(type)")
     
     # Cross-references table
     cursor.execute("""
@@ -102,9 +120,6 @@ def create_schema(conn):
             operand_index INTEGER
         )
     """)
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_xrefs_to ON xrefs(to_address)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_xrefs_from ON xrefs(from_address)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_xrefs_type ON xrefs(ref_type)")
     
     # Strings table
     cursor.execute("""
@@ -117,8 +132,6 @@ def create_schema(conn):
             is_terminated INTEGER
         )
     """)
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_strings_value ON strings(value)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_strings_addr ON strings(address)")
     
     # Comments table
     cursor.execute("""
@@ -129,7 +142,6 @@ def create_schema(conn):
             text TEXT
         )
     """)
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_comments_addr ON comments(address)")
     
     # Data types table
     cursor.execute("""
@@ -143,8 +155,6 @@ def create_schema(conn):
             definition TEXT
         )
     """)
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_data_types_name ON data_types(name)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_data_types_kind ON data_types(kind)")
     
     # Function bytes table
     cursor.execute("""
@@ -174,7 +184,6 @@ def create_schema(conn):
             PRIMARY KEY (caller_id, callee_id)
         )
     """)
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_call_graph_callee ON call_graph(callee_id)")
     
     # Imports table
     cursor.execute("""
@@ -186,7 +195,6 @@ def create_schema(conn):
             ordinal INTEGER
         )
     """)
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_imports_name ON imports(name)")
     
     # Exports table
     cursor.execute("""
@@ -197,11 +205,40 @@ def create_schema(conn):
             ordinal INTEGER
         )
     """)
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_exports_name ON exports(name)")
     
     conn.commit()
 
 
+# Secondary indexes, built once the tables are fully populated
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_segments_addr ON segments(start_address, end_address)",
+    "CREATE INDEX IF NOT EXISTS idx_functions_name ON functions(name)",
+    "CREATE INDEX IF NOT EXISTS idx_functions_addr ON functions(entry_address)",
+    "CREATE INDEX IF NOT EXISTS idx_symbols_name ON symbols(name)",
+    "CREATE INDEX IF NOT EXISTS idx_symbols_addr ON symbols(address)",
+    "CREATE INDEX IF NOT EXISTS idx_symbols_type ON symbols(type)",
+    "CREATE INDEX IF NOT EXISTS idx_xrefs_to ON xrefs(to_address)",
+    "CREATE INDEX IF NOT EXISTS idx_xrefs_from ON xrefs(from_address)",
+    "CREATE INDEX IF NOT EXISTS idx_xrefs_type ON xrefs(ref_type)",
+    "CREATE INDEX IF NOT EXISTS idx_strings_value ON strings(value)",
+    "CREATE INDEX IF NOT EXISTS idx_strings_addr ON strings(address)",
+    "CREATE INDEX IF NOT EXISTS idx_comments_addr ON comments(address)",
+    "CREATE INDEX IF NOT EXISTS idx_data_types_name ON data_types(name)",
+    "CREATE INDEX IF NOT EXISTS idx_data_types_kind ON data_types(kind)",
+    "CREATE INDEX IF NOT EXISTS idx_call_graph_callee ON call_graph(callee_id)",
+    "CREATE INDEX IF NOT EXISTS idx_imports_name ON imports(name)",
+    "CREATE INDEX IF NOT EXISTS idx_exports_name ON exports(name)",
+]
+
+
+def create_indexes(conn):
+    """Create all secondary indexes after the bulk load."""
+    cursor = conn.cursor()
+    for statement in INDEXES:
+        cursor.execute(statement)
+    print("Created %d indexes" % len(INDEXES))
+
+
 def export_metadata(conn, program):
     """Export program metadata."""
     cursor = conn.cursor()
@@ -226,7 +263,6 @@ def export_metadata(conn, program):
     for key, value in metadata.items():
         cursor.execute("INSERT OR REPLACE INTO metadata (key, value) VALUES (?, ?)", (key, value))
     
-    conn.commit()
     print("Exported metadata")
 
 
@@ -253,7 +289,6 @@ def export_segments(conn, program):
             1 if block.isInitialized() else 0
         ))
     
-    conn.commit()
     print("Exported %d segments" % len(list(memory.getBlocks())))
 
 
@@ -292,7 +327,6 @@ def export_functions(conn, program):
         ))
         count += 1
     
-    conn.commit()
     print("Exported %d functions" % count)
 
 
@@ -301,6 +335,11 @@ def export_symbols(conn, program):
     cursor = conn.cursor()
     st = program.getSymbolTable()
     
+    sql = """
+        INSERT INTO symbols (name, address, type, namespace, source, is_primary)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """
+    batch = []
     count = 0
     for sym in st.getAllSymbols(True):
         sym_type = str(sym.getSymbolType())
@@ -326,10 +365,7 @@ def export_symbols(conn, program):
         ns = sym.getParentNamespace()
         namespace = ns.getName(True) if ns and not ns.isGlobal() else None
         
-        cursor.execute("""
-            INSERT INTO symbols (name, address, type, namespace, source, is_primary)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (
+        batch.append((
             sym.getName(),
             sym.getAddress().getOffset(),
             type_str,
@@ -338,52 +374,69 @@ def export_symbols(conn, program):
             1 if sym.isPrimary() else 0
         ))
         count += 1
+        
+        if len(batch) >= BATCH_SIZE:
+            flush_batch(cursor, sql, batch)
+    
+    flush_batch(cursor, sql, batch)
     
-    conn.commit()
     print("Exported %d symbols" % count)
 
 
+def classify_ref_type(ref_type_obj):
+    """Map a Ghidra RefType to its (ref_type, is_call) column values."""
+    if ref_type_obj.isCall():
+        return 'call', 1
+    elif ref_type_obj.isJump():
+        return 'jump', 0
+    elif ref_type_obj.isRead():
+        return 'data_read', 0
+    elif ref_type_obj.isWrite():
+        return 'data_write', 0
+    elif ref_type_obj.isData():
+        return 'offset', 0
+    return 'other', 0
+
+
 def export_xrefs(conn, program):
     """Export all cross-references."""
     cursor = conn.cursor()
     rm = program.getReferenceManager()
     
+    sql = """
+        INSERT INTO xrefs (from_address, to_address, ref_type, is_call, operand_index)
+        VALUES (?, ?, ?, ?, ?)
+    """
+    batch = []
+    # RefType instances are singletons, so each one is classified once
+    ref_types = {}
     count = 0
     for ref_iter in rm.getReferenceIterator(program.getMinAddress()):
         ref = ref_iter
         
         ref_type_obj = ref.getReferenceType()
-        if ref_type_obj.isCall():
-            ref_type = 'call'
-        elif ref_type_obj.isJump():
-            ref_type = 'jump'
-        elif ref_type_obj.isRead():
-            ref_type = 'data_read'
-        elif ref_type_obj.isWrite():
-            ref_type = 'data_write'
-        elif ref_type_obj.isData():
-            ref_type = 'offset'
-        else:
-            ref_type = 'other'
+        classified = ref_types.get(ref_type_obj)
+        if classified is None:
+            classified = ref_types[ref_type_obj] = classify_ref_type(ref_type_obj)
+        ref_type, is_call = classified
         
-        cursor.execute("""
-            INSERT INTO xrefs (from_address, to_address, ref_type, is_call, operand_index)
-            VALUES (?, ?, ?, ?, ?)
-        """, (
+        batch.append((
             ref.getFromAddress().getOffset(),
             ref.getToAddress().getOffset(),
             ref_type,
-            1 if ref_type_obj.isCall() else 0,
+            is_call,
             ref.getOperandIndex()
         ))
         count += 1
         
-        # Commit in batches
-        if count % 10000 == 0:
-            conn.commit()
-            print("  ... %d xrefs" % count)
+        # Flush in batches
+        if len(batch) >= BATCH_SIZE:
+            flush_batch(cursor, sql, batch)
+            if count % 10000 == 0:
+                print("  ... %d xrefs" % count)
+    
+    flush_batch(cursor, sql, batch)
     
-    conn.commit()
     print("Exported %d cross-references" % count)
 
 
@@ -432,7 +485,6 @@ def export_strings(conn, program):
         except:
             pass
     
-    conn.commit()
     print("Exported %d strings" % count)
 
 
@@ -449,37 +501,56 @@ def export_comments(conn, program):
         (CodeUnit.REPEATABLE_COMMENT, 'repeatable')
     ]
     
+    sql = """
+        INSERT INTO comments (address, comment_type, text)
+        VALUES (?, ?, ?)
+    """
+    batch = []
     count = 0
     for cu in listing.getCodeUnits(True):
         for ghidra_type, type_str in comment_types:
             comment = cu.getComment(ghidra_type)
             if comment:
-                cursor.execute("""
-                    INSERT INTO comments (address, comment_type, text)
-                    VALUES (?, ?, ?)
-                """, (
+                batch.append((
                     cu.getAddress().getOffset(),
                     type_str,
                     comment
                 ))
                 count += 1
+        
+        if len(batch) >= BATCH_SIZE:
+            flush_batch(cursor, sql, batch)
+    
+    flush_batch(cursor, sql, batch)
     
-    conn.commit()
     print("Exported %d comments" % count)
 
 
-def export_function_bytes(conn, program):
-    """Export raw bytes for each function."""
-    cursor = conn.cursor()
-    fm = program.getFunctionManager()
-    memory = program.getMemory()
+def load_function_index(conn, program):
+    """Return the program's functions and an entry offset -> (id, size) map.
     
-    # Build function ID mapping
+    Shared by the per-function exporters so the function table is queried
+    and the Ghidra function iterator walked only once.
+    """
+    cursor = conn.cursor()
     cursor.execute("SELECT id, entry_address, size FROM functions")
     func_map = {row[1]: (row[0], row[2]) for row in cursor.fetchall()}
+    func_list = list(program.getFunctionManager().getFunctions(True))
+    return func_list, func_map
+
+
+def export_function_bytes(conn, program, func_list, func_map):
+    """Export raw bytes for each function."""
+    cursor = conn.cursor()
+    memory = program.getMemory()
     
+    sql = """
+        INSERT INTO function_bytes (function_id, bytes, start_address, size)
+        VALUES (?, ?, ?, ?)
+    """
+    batch = []
     count = 0
-    for func in fm.getFunctions(True):
+    for func in func_list:
         entry_offset = func.getEntryPoint().getOffset()
         if entry_offset not in func_map:
             continue
@@ -501,10 +572,7 @@ def export_function_bytes(conn, program):
                     byte_list.extend(bytes_arr)
             
             if byte_list:
-                cursor.execute("""
-                    INSERT INTO function_bytes (function_id, bytes, start_address, size)
-                    VALUES (?, ?, ?, ?)
-                """, (
+                batch.append((
                     func_id,
                     sqlite3.Binary(bytes(byte_list)),
                     entry_offset,
@@ -515,28 +583,33 @@ def export_function_bytes(conn, program):
             pass
         except Exception as e:
             print("Warning: Failed to export bytes for %s: %s" % (func.getName(), str(e)))
+        
+        if len(batch) >= BATCH_SIZE:
+            flush_batch(cursor, sql, batch)
+    
+    flush_batch(cursor, sql, batch)
     
-    conn.commit()
     print("Exported bytes for %d functions" % count)
 
 
-def export_function_disassembly(conn, program):
+def export_function_disassembly(conn, program, func_list, func_map):
     """Export disassembly listing for each function."""
     cursor = conn.cursor()
-    fm = program.getFunctionManager()
     listing = program.getListing()
     
-    # Build function ID mapping
-    cursor.execute("SELECT id, entry_address FROM functions")
-    func_map = {row[1]: row[0] for row in cursor.fetchall()}
-    
+    sql = """
+        INSERT INTO function_disassembly (function_id, disassembly, instruction_count)
+        VALUES (?, ?, ?)
+    """
+    batch = []
+    batch_chars = 0
     count = 0
-    for func in fm.getFunctions(True):
+    for func in func_list:
         entry_offset = func.getEntryPoint().getOffset()
         if entry_offset not in func_map:
             continue
         
-        func_id = func_map[entry_offset]
+        func_id = func_map[entry_offset][0]
         
         try:
             body = func.getBody()
@@ -546,71 +619,70 @@ def export_function_disassembly(conn, program):
             for cu in listing.getCodeUnits(body, True):
                 addr = cu.getAddress()
                 try:
-                    bytes_hex = hexlify(bytearray(cu.getBytes())).decode('ascii')
+                    # Only the first 8 bytes are shown, so don't hex the rest
+                    bytes_hex = hexlify(bytearray(cu.getBytes()[:8])).decode('ascii')
                 except:
                     bytes_hex = '??'
                 
                 # Format: address: bytes mnemonic operands
                 line = "0x%08X: %-16s %s" % (
                     addr.getOffset(),
-                    bytes_hex[:16],
+                    bytes_hex,
                     cu.toString()
                 )
                 lines.append(line)
                 instr_count += 1
             
             if lines:
-                cursor.execute("""
-                    INSERT INTO function_disassembly (function_id, disassembly, instruction_count)
-                    VALUES (?, ?, ?)
-                """, (
+                disassembly = '\n'.join(lines)
+                batch.append((
                     func_id,
-                    '\n'.join(lines),
+                    disassembly,
                     instr_count
                 ))
+                batch_chars += len(disassembly)
                 count += 1
         except Exception as e:
             print("Warning: Failed to export disassembly for %s: %s" % (func.getName(), str(e)))
+        
+        if len(batch) >= BATCH_SIZE or batch_chars >= DISASM_BATCH_CHARS:
+            flush_batch(cursor, sql, batch)
+            batch_chars = 0
+    
+    flush_batch(cursor, sql, batch)
     
-    conn.commit()
     print("Exported disassembly for %d functions" % count)
 
 
-def export_call_graph(conn, program):
+def export_call_graph(conn, program, func_list, func_map):
     """Export materialized call graph."""
     cursor = conn.cursor()
-    fm = program.getFunctionManager()
-    
-    # Build function address to ID mapping
-    cursor.execute("SELECT id, entry_address FROM functions")
-    func_map = {row[1]: row[0] for row in cursor.fetchall()}
     
     # Count calls between functions
     call_counts = {}  # (caller_id, callee_id) -> count
     
-    for func in fm.getFunctions(True):
+    for func in func_list:
         caller_addr = func.getEntryPoint().getOffset()
         if caller_addr not in func_map:
             continue
-        caller_id = func_map[caller_addr]
+        caller_id = func_map[caller_addr][0]
         
         called_funcs = func.getCalledFunctions(ConsoleTaskMonitor())
         for called_func in called_funcs:
             callee_addr = called_func.getEntryPoint().getOffset()
             if callee_addr not in func_map:
                 continue
-            callee_id = func_map[callee_addr]
+            callee_id = func_map[callee_addr][0]
             
             key = (caller_id, callee_id)
             call_counts[key] = call_counts.get(key, 0) + 1
     
-    for (caller_id, callee_id), count in call_counts.items():
-        cursor.execute("""
-            INSERT INTO call_graph (caller_id, callee_id, call_count)
-            VALUES (?, ?, ?)
-        """, (caller_id, callee_id, count))
+    cursor.executemany("""
+        INSERT INTO call_graph (caller_id, callee_id, call_count)
+        VALUES (?, ?, ?)
+    """, [(caller_id, callee_id, count)
+          for (caller_id, callee_id), count in call_counts.items()])
     
-    conn.commit()
     print("Exported call graph with %d edges" % len(call_counts))
 
 
@@ -626,21 +698,32 @@ def main():
     
     # Create database and schema
     conn = sqlite3.connect(OUTPUT_DB)
-    create_schema(conn)
+    for pragma in EXPORT_PRAGMAS:
+        conn.execute(pragma)
+    create_tables(conn)
     
     program = currentProgram
     
-    # Export all data
-    export_metadata(conn, program)
-    export_segments(conn, program)
-    export_functions(conn, program)
-    export_symbols(conn, program)
-    export_xrefs(conn, program)
-    export_strings(conn, program)
-    export_comments(conn, program)
-    export_function_bytes(conn, program)
-    export_function_disassembly(conn, program)
-    export_call_graph(conn, program)
+    # Export all data in a single transaction; a failed export leaves
+    # nothing worth keeping, so the partial database is removed instead
+    try:
+        export_metadata(conn, program)
+        export_segments(conn, program)
+        export_functions(conn, program)
+        export_symbols(conn, program)
+        export_xrefs(conn, program)
+        export_strings(conn, program)
+        export_comments(conn, program)
+        func_list, func_map = load_function_index(conn, program)
+        export_function_bytes(conn, program, func_list, func_map)
+        export_function_disassembly(conn, program, func_list, func_map)
+        export_call_graph(conn, program, func_list, func_map)
+        create_indexes(conn)
+        conn.commit()
+    except:
+        conn.close()
+        os.remove(OUTPUT_DB)
+        raise
     
     # Final stats
     cursor = conn.cursor()
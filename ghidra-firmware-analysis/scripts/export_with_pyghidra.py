@@ -33,9 +33,33 @@ from binascii import hexlify
 # Script version
 SCRIPT_VERSION = "1.0.0"
 
+# The output is a one-shot artifact that is deleted and rebuilt on every
+# run, so durability is traded for load speed: no journal, no fsync, and
+# an exclusive lock for the lifetime of the connection.
+EXPORT_PRAGMAS = [
+    "PRAGMA journal_mode=OFF",
+    "PRAGMA synchronous=OFF",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-262144",  # 256 MiB
+    "PRAGMA locking_mode=EXCLUSIVE",
+]
 
-def create_schema(conn):
-    """Create all database tables."""
+# Rows buffered per executemany() call in the bulk exports
+BATCH_SIZE = 5000
+
+# Disassembly rows are large, so their buffer is also capped by total text size
+DISASM_BATCH_CHARS = 8 * 1024 * 1024
+
+
+def flush_batch(cursor, sql, batch):
+    """Insert buffered rows with a single executemany() and empty the buffer."""
+    if batch:
+        cursor.executemany(sql, batch)
+        batch.clear()
+
+
+def create_tables(conn):
+    """Create all database tables (indexes are built by create_indexes)."""
     cursor = conn.cursor()
     
     schema_sql = """
@@ -55,7 +79,6 @@ def create_schema(conn):
         permissions TEXT,
         is_initialized INTEGER
     );
-    CREATE INDEX IF NOT EXISTS idx_segments_addr ON segments(start_address, end_address);
     
     -- Functions table
     CREATE TABLE IF NOT EXISTS functions (
@@ -71,8 +94,6 @@ def create_schema(conn):
         namespace TEXT,
         comment TEXT
     );
-    CREATE INDEX IF NOT EXISTS idx_functions_name ON functions(name);
-    CREATE INDEX IF NOT EXISTS idx_functions_addr ON functions(entry_address);
     
     -- Symbols table
     CREATE TABLE IF NOT EXISTS symbols (
@@ -84,9 +105,6 @@ def create_schema(conn):
         source TEXT,
         is_primary INTEGER
     );
-    CREATE INDEX IF NOT EXISTS idx_symbols_name ON symbols(name);
-    CREATE INDEX IF NOT EXISTS idx_symbols_addr ON symbols(address);
-    CREATE INDEX IF NOT EXISTS idx_symbols_type ON symbols(type);
     
     -- Cross-references table
     CREATE TABLE IF NOT EXISTS xrefs (
@@ -97,9 +115,6 @@ def create_schema(conn):
         is_call INTEGER,
         operand_index INTEGER
     );
-    CREATE INDEX IF NOT EXISTS idx_xrefs_to ON xrefs(to_address);
-    CREATE INDEX IF NOT EXISTS idx_xrefs_from ON xrefs(from_address);
-    CREATE INDEX IF NOT EXISTS idx_xrefs_type ON xrefs(ref_type);
     
     -- Strings table
     CREATE TABLE IF NOT EXISTS strings (
@@ -110,8 +125,6 @@ def create_schema(conn):
         encoding TEXT,
         is_terminated INTEGER
     );
-    CREATE INDEX IF NOT EXISTS idx_strings_value ON strings(value);
-    CREATE INDEX IF NOT EXISTS idx_strings_addr ON strings(address);
     
     -- Comments table
     CREATE TABLE IF NOT EXISTS comments (
@@ -120,7 +133,6 @@ def create_schema(conn):
         comment_type TEXT,
         text TEXT
     );
-    CREATE INDEX IF NOT EXISTS idx_comments_addr ON comments(address);
     
     -- Data types table
     CREATE TABLE IF NOT EXISTS data_types (
@@ -132,8 +144,6 @@ def create_schema(conn):
         alignment INTEGER,
         definition TEXT
     );
-    CREATE INDEX IF NOT EXISTS idx_data_types_name ON data_types(name);
-    CREATE INDEX IF NOT EXISTS idx_data_types_kind ON data_types(kind);
     
     -- Function bytes table
     CREATE TABLE IF NOT EXISTS function_bytes (
@@ -157,7 +167,6 @@ def create_schema(conn):
         call_count INTEGER,
         PRIMARY KEY (caller_id, callee_id)
     );
-    CREATE INDEX IF NOT EXISTS idx_call_graph_callee ON call_graph(callee_id);
     
     -- Imports table
     CREATE TABLE IF NOT EXISTS imports (
@@ -167,7 +176,6 @@ def create_schema(conn):
         address INTEGER,
         ordinal INTEGER
     );
-    CREATE INDEX IF NOT EXISTS idx_imports_name ON imports(name);
     
     -- Exports table
     CREATE TABLE IF NOT EXISTS exports (
@@ -176,28 +184,91 @@ def create_schema(conn):
         address INTEGER,
         ordinal INTEGER
     );
-    CREATE INDEX IF NOT EXISTS idx_exports_name ON exports(name);
     """
     
     cursor.executescript(schema_sql)
     conn.commit()
 
 
+# Secondary indexes, built once the tables are fully populated
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_segments_addr ON segments(start_address, end_address)",
+    "CREATE INDEX IF NOT EXISTS idx_functions_name ON functions(name)",
+    "CREATE INDEX IF NOT EXISTS idx_functions_addr ON functions(entry_address)",
+    "CREATE INDEX IF NOT EXISTS idx_symbols_name ON symbols(name)",
+    "CREATE INDEX IF NOT EXISTS idx_symbols_addr ON symbols(address)",
+    "CREATE INDEX IF NOT EXISTS idx_symbols_type ON symbols(type)",
+    "CREATE INDEX IF NOT EXISTS idx_xrefs_to ON xrefs(to_address)",
+    "CREATE INDEX IF NOT EXISTS idx_xrefs_from ON xrefs(from_address)",
+    "CREATE INDEX IF NOT EXISTS idx_xrefs_type ON xrefs(ref_type)",
+    "CREATE INDEX IF NOT EXISTS idx_strings_value ON strings(value)",
+    "CREATE INDEX IF NOT EXISTS idx_strings_addr ON strings(address)",
+    "CREATE INDEX IF NOT EXISTS idx_comments_addr ON comments(address)",
+    "CREATE INDEX IF NOT EXISTS idx_data_types_name ON data_types(name)",
+    "CREATE INDEX IF NOT EXISTS idx_data_types_kind ON data_types(kind)",
+    "CREATE INDEX IF NOT EXISTS idx_call_graph_callee ON call_graph(callee_id)",
+    "CREATE INDEX IF NOT EXISTS idx_imports_name ON imports(name)",
+    "CREATE INDEX IF NOT EXISTS idx_exports_name ON exports(name)",
+]
+
+
+def create_indexes(conn):
+    """Create all secondary indexes after the bulk load."""
+    cursor = conn.cursor()
+    for statement in INDEXES:
+        cursor.execute(statement)
+
+
+def classify_ref_type(ref_type_obj):
+    """Map a Ghidra RefType to its (ref_type, is_call) column values."""
+    if ref_type_obj.isCall():
+        return 'call', 1
+    elif ref_type_obj.isJump():
+        return 'jump', 0
+    elif ref_type_obj.isRead():
+        return 'data_read', 0
+    elif ref_type_obj.isWrite():
+        return 'data_write', 0
+    elif ref_type_obj.isData():
+        return 'offset', 0
+    return 'other', 0
+
+
 def export_program(program, flat_api, output_path: str, project_name: str = "unknown"):
     """Export a Ghidra program to SQLite database."""
-    from ghidra.program.model.listing import CodeUnit
-    from ghidra.util.task import ConsoleTaskMonitor
-    
     # Remove existing database
     if os.path.exists(output_path):
         os.remove(output_path)
     
     conn = sqlite3.connect(output_path)
-    create_schema(conn)
-    cursor = conn.cursor()
+    for pragma in EXPORT_PRAGMAS:
+        conn.execute(pragma)
+    create_tables(conn)
     
     print(f"Exporting {program.getName()} to {output_path}")
     
+    # Export all data in a single transaction; a failed export leaves
+    # nothing worth keeping, so the partial database is removed instead
+    try:
+        export_program_data(conn, program, flat_api, project_name)
+        conn.commit()
+    except BaseException:
+        conn.close()
+        os.remove(output_path)
+        raise
+    
+    conn.close()
+    print(f"Export complete: {output_path}")
+    return output_path
+
+
+def export_program_data(conn, program, flat_api, project_name: str):
+    """Export every table and build the indexes, without committing."""
+    from ghidra.program.model.listing import CodeUnit
+    from ghidra.util.task import ConsoleTaskMonitor
+    
+    cursor = conn.cursor()
+    
     # Export metadata
     lang = program.getLanguage()
     metadata = {
@@ -270,11 +341,15 @@ def export_program(program, flat_api, output_path: str, project_name: str = "unk
             plate_comment
         ))
         func_count += 1
-    conn.commit()
     print(f"  Exported {func_count} functions")
     
     # Export symbols
     st = program.getSymbolTable()
+    sym_sql = """
+        INSERT INTO symbols (name, address, type, namespace, source, is_primary)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """
+    sym_batch = []
     sym_count = 0
     for sym in st.getAllSymbols(True):
         sym_type = str(sym.getSymbolType())
@@ -298,10 +373,7 @@ def export_program(program, flat_api, output_path: str, project_name: str = "unk
         ns = sym.getParentNamespace()
         namespace = ns.getName(True) if ns and not ns.isGlobal() else None
         
-        cursor.execute("""
-            INSERT INTO symbols (name, address, type, namespace, source, is_primary)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (
+        sym_batch.append((
             sym.getName(),
             sym.getAddress().getOffset(),
             type_str,
@@ -310,12 +382,22 @@ def export_program(program, flat_api, output_path: str, project_name: str = "unk
             1 if sym.isPrimary() else 0
         ))
         sym_count += 1
-    conn.commit()
+        
+        if len(sym_batch) >= BATCH_SIZE:
+            flush_batch(cursor, sym_sql, sym_batch)
+    flush_batch(cursor, sym_sql, sym_batch)
     print(f"  Exported {sym_count} symbols")
     
     # Export cross-references
     rm = program.getReferenceManager()
+    xref_sql = """
+        INSERT INTO xrefs (from_address, to_address, ref_type, is_call, operand_index)
+        VALUES (?, ?, ?, ?, ?)
+    """
+    xref_batch = []
     xref_count = 0
+    # RefType instances are singletons, so each one is classified once
+    ref_types = {}
     
     addr_iter = program.getMemory().getAddresses(True)
     while addr_iter.hasNext():
@@ -323,36 +405,26 @@ def export_program(program, flat_api, output_path: str, project_name: str = "unk
         refs = rm.getReferencesFrom(addr)
         for ref in refs:
             ref_type_obj = ref.getReferenceType()
-            if ref_type_obj.isCall():
-                ref_type = 'call'
-            elif ref_type_obj.isJump():
-                ref_type = 'jump'
-            elif ref_type_obj.isRead():
-                ref_type = 'data_read'
-            elif ref_type_obj.isWrite():
-                ref_type = 'data_write'
-            elif ref_type_obj.isData():
-                ref_type = 'offset'
-            else:
-                ref_type = 'other'
+            classified = ref_types.get(ref_type_obj)
+            if classified is None:
+                classified = ref_types[ref_type_obj] = classify_ref_type(ref_type_obj)
+            ref_type, is_call = classified
             
-            cursor.execute("""
-                INSERT INTO xrefs (from_address, to_address, ref_type, is_call, operand_index)
-                VALUES (?, ?, ?, ?, ?)
-            """, (
+            xref_batch.append((
                 ref.getFromAddress().getOffset(),
                 ref.getToAddress().getOffset(),
                 ref_type,
-                1 if ref_type_obj.isCall() else 0,
+                is_call,
                 ref.getOperandIndex()
             ))
             xref_count += 1
             
-            if xref_count % 10000 == 0:
-                conn.commit()
-                print(f"    ... {xref_count} xrefs")
+            if len(xref_batch) >= BATCH_SIZE:
+                flush_batch(cursor, xref_sql, xref_batch)
+                if xref_count % 10000 == 0:
+                    print(f"    ... {xref_count} xrefs")
     
-    conn.commit()
+    flush_batch(cursor, xref_sql, xref_batch)
     print(f"  Exported {xref_count} cross-references")
     
     # Export strings
@@ -392,7 +464,6 @@ def export_program(program, flat_api, output_path: str, project_name: str = "unk
             str_count += 1
         except Exception:
             pass
-    conn.commit()
     print(f"  Exported {str_count} strings")
     
     # Export comments
@@ -404,27 +475,44 @@ def export_program(program, flat_api, output_path: str, project_name: str = "unk
         (CodeUnit.REPEATABLE_COMMENT, 'repeatable')
     ]
     
+    comment_sql = """
+        INSERT INTO comments (address, comment_type, text)
+        VALUES (?, ?, ?)
+    """
+    comment_batch = []
     comment_count = 0
     for cu in listing.getCodeUnits(True):
         for ghidra_type, type_str in comment_types:
             comment = cu.getComment(ghidra_type)
             if comment:
-                cursor.execute("""
-                    INSERT INTO comments (address, comment_type, text)
-                    VALUES (?, ?, ?)
-                """, (cu.getAddress().getOffset(), type_str, comment))
+                comment_batch.append((cu.getAddress().getOffset(), type_str, comment))
                 comment_count += 1
-    conn.commit()
+        
+        if len(comment_batch) >= BATCH_SIZE:
+            flush_batch(cursor, comment_sql, comment_batch)
+    flush_batch(cursor, comment_sql, comment_batch)
     print(f"  Exported {comment_count} comments")
     
     # Export function bytes and disassembly
     cursor.execute("SELECT id, entry_address, size FROM functions")
     func_map = {row[1]: (row[0], row[2]) for row in cursor.fetchall()}
+    func_list = list(fm.getFunctions(True))
     
+    bytes_sql = """
+        INSERT INTO function_bytes (function_id, bytes, start_address, size)
+        VALUES (?, ?, ?, ?)
+    """
+    disasm_sql = """
+        INSERT INTO function_disassembly (function_id, disassembly, instruction_count)
+        VALUES (?, ?, ?)
+    """
+    bytes_batch = []
+    disasm_batch = []
+    disasm_chars = 0
     bytes_count = 0
     disasm_count = 0
     
-    for func in fm.getFunctions(True):
+    for func in func_list:
         entry_offset = func.getEntryPoint().getOffset()
         if entry_offset not in func_map:
             continue
@@ -445,10 +533,7 @@ def export_program(program, flat_api, output_path: str, project_name: str = "unk
             if byte_list:
                 # Convert signed bytes to unsigned
                 unsigned_bytes = bytes([b & 0xff for b in byte_list])
-                cursor.execute("""
-                    INSERT INTO function_bytes (function_id, bytes, start_address, size)
-                    VALUES (?, ?, ?, ?)
-                """, (func_id, unsigned_bytes, entry_offset, len(unsigned_bytes)))
+                bytes_batch.append((func_id, unsigned_bytes, entry_offset, len(unsigned_bytes)))
                 bytes_count += 1
         except Exception as e:
             pass
@@ -472,56 +557,56 @@ def export_program(program, flat_api, output_path: str, project_name: str = "unk
                 instr_count += 1
             
             if lines:
-                cursor.execute("""
-                    INSERT INTO function_disassembly (function_id, disassembly, instruction_count)
-                    VALUES (?, ?, ?)
-                """, (func_id, '\n'.join(lines), instr_count))
+                disassembly = '\n'.join(lines)
+                disasm_batch.append((func_id, disassembly, instr_count))
+                disasm_chars += len(disassembly)
                 disasm_count += 1
         except Exception:
             pass
-    
-    conn.commit()
+        
+        if len(bytes_batch) >= BATCH_SIZE:
+            flush_batch(cursor, bytes_sql, bytes_batch)
+        if len(disasm_batch) >= BATCH_SIZE or disasm_chars >= DISASM_BATCH_CHARS:
+            flush_batch(cursor, disasm_sql, disasm_batch)
+            disasm_chars = 0
+    
+    flush_batch(cursor, bytes_sql, bytes_batch)
+    flush_batch(cursor, disasm_sql, disasm_batch)
     print(f"  Exported bytes for {bytes_count} functions")
     print(f"  Exported disassembly for {disasm_count} functions")
     
-    # Export call graph
-    cursor.execute("SELECT id, entry_address FROM functions")
-    func_addr_map = {row[1]: row[0] for row in cursor.fetchall()}
-    
+    # Export call graph (reuses the function map and list from above)
     call_counts = {}
     monitor = ConsoleTaskMonitor()
     
-    for func in fm.getFunctions(True):
+    for func in func_list:
         caller_addr = func.getEntryPoint().getOffset()
-        if caller_addr not in func_addr_map:
+        if caller_addr not in func_map:
             continue
-        caller_id = func_addr_map[caller_addr]
+        caller_id = func_map[caller_addr][0]
         
         try:
             called_funcs = func.getCalledFunctions(monitor)
             for called_func in called_funcs:
                 callee_addr = called_func.getEntryPoint().getOffset()
-                if callee_addr not in func_addr_map:
+                if callee_addr not in func_map:
                     continue
-                callee_id = func_addr_map[callee_addr]
+                callee_id = func_map[callee_addr][0]
                 
                 key = (caller_id, callee_id)
                 call_counts[key] = call_counts.get(key, 0) + 1
         except Exception:
             pass
     
-    for (caller_id, callee_id), count in call_counts.items():
-        cursor.execute("""
-            INSERT INTO call_graph (caller_id, callee_id, call_count)
-            VALUES (?, ?, ?)
-        """, (caller_id, callee_id, count))
-    
-    conn.commit()
+    cursor.executemany("""
+        INSERT INTO call_graph (caller_id, callee_id, call_count)
+        VALUES (?, ?, ?)
+    """, [(caller_id, callee_id, count)
+          for (caller_id, callee_id), count in call_counts.items()])
     print(f"  Exported call graph with {len(call_counts)} edges")
     
-    conn.close()
-    print(f"Export complete: {output_path}")
-    return output_path
+    create_indexes(conn)
+    print(f"  Created {len(INDEXES)} indexes")
 
 
 def main():